@@ -0,0 +1,253 @@
+# ================= 资源扫描层 =================
+# 头像 / 描述图 / 头部动图等资源目录：每个目录只做一次 os.scandir，按目录 mtime 缓存文件表，
+# 供 SkinSystem 与爬虫共用，避免逐个皮肤逐个扩展名 os.path.exists
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+
+try:
+    from PIL import Image, ImageSequence
+except ImportError:  # 没装 Pillow 时不做处理，网页直接引用仓库里的原图
+    Image = None
+
+AVATAR_EXTS = ('.gif', '.jpg', '.png', '.jpeg')  # 同名头像按此顺序优先
+ICON_EXTS = ('.gif', '.jpg')  # 品质图标按此顺序优先
+
+
+def safe_name(name):
+    """皮肤名 -> 资源文件名 (去掉路径分隔符与空格)"""
+    return name.replace("/", "_").replace("\\", "_").replace(" ", "")
+
+
+class AssetScanner:
+    def __init__(self):
+        self._cache = {}  # 目录 -> (mtime_ns, 排序后的文件名, {exts: stem 映射})
+        self.lock = threading.Lock()
+
+    def _entry(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._cache.get(directory)
+        if cached and cached[0] == mtime: return cached
+        with os.scandir(directory) as it:
+            names = sorted(e.name for e in it if e.is_file())
+        entry = (mtime, names, {})
+        with self.lock:
+            self._cache[directory] = entry
+        return entry
+
+    def files(self, directory):
+        """目录下的文件名 (已排序)；目录不存在返回空"""
+        entry = self._entry(directory)
+        return entry[1] if entry else []
+
+    def by_stem(self, directory, exts=None):
+        """
+        文件名去扩展名 -> 文件名
+        exts 给定时只收这些扩展名 (不区分大小写)，同名按 exts 顺序取优先；否则取排序后的第一个
+        """
+        entry = self._entry(directory)
+        if not entry: return {}
+        maps = entry[2]
+        if exts not in maps:
+            rank = {e: i for i, e in enumerate(exts)} if exts else None
+            best = {}
+            for name in entry[1]:
+                stem, ext = os.path.splitext(name)
+                if rank is None:
+                    best.setdefault(stem, (0, name))
+                    continue
+                r = rank.get(ext.lower())
+                if r is not None and (stem not in best or r < best[stem][0]):
+                    best[stem] = (r, name)
+            maps[exts] = {stem: name for stem, (_, name) in best.items()}
+        return maps[exts]
+
+    def exists(self, path):
+        directory, name = os.path.split(path)
+        return name in self.by_name(directory)
+
+    def by_name(self, directory):
+        entry = self._entry(directory)
+        if not entry: return frozenset()
+        maps = entry[2]
+        if 'names' not in maps: maps['names'] = frozenset(entry[1])
+        return maps['names']
+
+    def manifest(self, directory):
+        """[(文件名, 大小, mtime_ns), ...]，用于判断资源内容是否变动 (同名覆盖不改目录 mtime，所以不走缓存)"""
+        try:
+            with os.scandir(directory) as it:
+                return sorted((e.name, st.st_size, st.st_mtime_ns) for e in it if e.is_file() for st in (e.stat(),))
+        except OSError:
+            return []
+
+    def invalidate(self, directory=None):
+        """写入新文件后调用 (mtime 精度不够时保证下次重新扫描)"""
+        with self.lock:
+            if directory is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(directory, None)
+
+
+# 进程内共享的扫描器
+scanner = AssetScanner()
+
+
+# ================= 发布资源管线 =================
+# 网页引用的图片先缩放 / 转成 WebP，再以内容哈希命名写入输出目录 (可长期缓存)；
+# 清单记录每个源文件的 (大小, mtime)，只有变动过的源文件才重新处理
+
+ASSET_PIPELINE_VERSION = 2
+WEBP_QUALITY = 80
+# 各类资源的目标像素 (宽, 高, 是否按 cover 铺满)，按页面显示尺寸的 2 倍
+BLOB_KIND = 'data'
+_MIME_TYPES = {'.webp': 'image/webp', '.gif': 'image/gif', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
+               '.png': 'image/png'}
+ASSET_SIZES = {
+    'avatar': (96, 96, True),
+    'header': (110, 110, True),
+    'icon': (4096, 120, False),
+    'desc': (4096, 80, False),
+}
+
+
+def _fit(im, width, height, cover):
+    scale = (max if cover else min)(width / im.width, height / im.height)
+    if scale >= 1: return im
+    return im.resize((max(1, round(im.width * scale)), max(1, round(im.height * scale))), Image.LANCZOS)
+
+
+def _encode(src, kind):
+    """源图 -> (字节, 扩展名)；动图转为动画 WebP，静图转 WebP；结果反而更大或无法解析时保留原文件"""
+    with open(src, 'rb') as f:
+        raw = f.read()
+    ext = os.path.splitext(src)[1].lower()
+    if Image is None: return raw, ext
+    width, height, cover = ASSET_SIZES[kind]
+    buf = io.BytesIO()
+    try:
+        with Image.open(io.BytesIO(raw)) as im:
+            if getattr(im, 'is_animated', False):
+                frames, durations = [], []
+                for frame in ImageSequence.Iterator(im):
+                    durations.append(frame.info.get('duration', 100))
+                    frames.append(_fit(frame.convert('RGBA'), width, height, cover))
+                frames[0].save(buf, 'WEBP', save_all=True, append_images=frames[1:], duration=durations,
+                               loop=im.info.get('loop', 0), quality=WEBP_QUALITY, method=4)
+            else:
+                mode = 'RGBA' if 'A' in im.mode or 'transparency' in im.info else 'RGB'
+                _fit(im.convert(mode), width, height, cover).save(buf, 'WEBP', quality=WEBP_QUALITY, method=4)
+    except (OSError, ValueError):
+        return raw, ext
+    data = buf.getvalue()
+    return (data, '.webp') if len(data) < len(raw) else (raw, ext)
+
+
+def _data_uri(path):
+    mime = _MIME_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+    with open(path, 'rb') as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+
+class AssetPipeline:
+    """
+    用法: 每次生成网页时对引用的资源调用 url()，生成结束后调用 finish()
+    输出: {out_dir}/{kind}/{原文件名}.{内容哈希}.{扩展名}；本次没被引用的旧输出会被清理
+    没装 Pillow 时图片不经处理，url() 直接返回原图路径 (生成的数据文件仍写入输出目录)
+    """
+
+    def __init__(self, root, out_dir, manifest_path):
+        self.root = root
+        self.out_dir = out_dir
+        self.manifest_path = manifest_path
+        self.signature = f"{ASSET_PIPELINE_VERSION}:{'webp' if Image else 'source'}:{WEBP_QUALITY}"
+        self._entries = self._load()
+        self._used = set()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, rel_out, data):
+        path = os.path.join(self.root, self.out_dir, rel_out)
+        if os.path.exists(path): return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def url(self, rel_path, kind, inline_max=0):
+        """
+        源文件 (相对仓库根目录) -> 网页引用路径；源文件不存在时原样返回
+        inline_max > 0 时，处理后不超过该字节数的资源直接返回 data URI
+        """
+        src = os.path.join(self.root, rel_path)
+        try:
+            st = os.stat(src)
+        except OSError:
+            return './' + rel_path
+        if Image is None:  # 无法缩放转码时复制一份只会让仓库里每张图存两遍
+            if 0 < inline_max and st.st_size <= inline_max: return _data_uri(src)
+            return './' + rel_path
+        key = f"{kind}:{rel_path}"
+        stamp = [st.st_size, st.st_mtime_ns, self.signature]
+        entry = self._entries.get(key)
+        if not entry or entry['stamp'] != stamp or \
+                not os.path.exists(os.path.join(self.root, self.out_dir, entry['out'])):
+            data, ext = _encode(src, kind)
+            stem = os.path.splitext(os.path.basename(rel_path))[0]
+            rel_out = f"{kind}/{stem}.{hashlib.sha1(data).hexdigest()[:10]}{ext}"
+            self._write(rel_out, data)
+            entry = self._entries[key] = {'stamp': stamp, 'out': rel_out}
+            self._dirty = True
+        self._used.add(key)
+        out_path = os.path.join(self.root, self.out_dir, entry['out'])
+        if inline_max > 0 and os.path.getsize(out_path) <= inline_max: return _data_uri(out_path)
+        return f"./{self.out_dir}/{entry['out']}"
+
+    def write_blob(self, name, ext, data):
+        """生成的数据文件 (如行数据 JSON) 同样按内容哈希命名写入 {out_dir}/data/，返回引用路径"""
+        rel_out = f"{BLOB_KIND}/{name}.{hashlib.sha1(data).hexdigest()[:10]}{ext}"
+        self._write(rel_out, data)
+        key = f"{BLOB_KIND}:{name}"
+        if self._entries.get(key, {}).get('out') != rel_out:
+            self._entries[key] = {'stamp': None, 'out': rel_out}
+            self._dirty = True
+        self._used.add(key)
+        return f"./{self.out_dir}/{rel_out}"
+
+    def discard(self):
+        """生成失败时调用：丢弃本次的引用记录，避免残缺的引用集合在下次 finish() 时误删输出"""
+        self._used = set()
+
+    def finish(self):
+        """保存清单并删除本次未引用的输出文件"""
+        stale = [k for k in self._entries if k not in self._used]
+        for k in stale:
+            del self._entries[k]
+        keep = {e['out'] for e in self._entries.values()}
+        base = os.path.join(self.root, self.out_dir)
+        for kind in (*ASSET_SIZES, BLOB_KIND):
+            for name in scanner.files(os.path.join(base, kind)):
+                if f"{kind}/{name}" not in keep:
+                    os.remove(os.path.join(base, kind, name))
+            scanner.invalidate(os.path.join(base, kind))
+        if stale or self._dirty:
+            with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        self._used = set()
+        self._dirty = False
@@ -0,0 +1,204 @@
+# ================= 性能基准 =================
+# 用合成的皮肤库 (默认 1k / 10k / 100k 条) 测 SkinSystem 的热点路径，报告 ops/sec 与峰值内存，
+# 可保存为基线并在回归超过容差时以非零状态退出:
+#   python hok_bench.py --save-baseline bench_baseline.json
+#   python hok_bench.py --baseline bench_baseline.json --tolerance 0.25
+# 所有读写都在临时目录进行，不会碰到 LOCAL_REPO_PATH 下的真实数据
+
+import argparse
+import copy
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import hok_logic
+import hok_schema
+from hok_assets import scanner
+
+HEROES = ["李白", "貂蝉", "小乔", "孙尚香", "公孙离", "伽罗", "吕布", "关羽", "云缨", "妲己", "安琪拉", "上官婉儿",
+          "马超", "狄仁杰", "大乔", "朵莉亚", "李信", "赵云", "露娜", "王昭君", "杨玉环", "西施", "诸葛亮", "韩信"]
+SKIN_WORDS = ["神骥", "问心剑", "线条小狗", "千魇归渊", "沧流箭", "春霖将至", "离恨烟", "舞狮寰", "颠倒童话", "越千峰",
+              "鸣幻洲", "镇沧海", "逐星野", "聚万邦", "乘龙", "忆丹青", "赴朔漠", "花好人间", "星元", "天鹅之梦"]
+# 含父子层级的品质代码 (50.1 -> 50, 7500 -> 5000, 900 -> 500)
+QUALITY_CODES = [1, 20, 50, 50.1, 100, 250, 500, 900, 1000, 2500, 5000, 7500, 10000]
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def _money(rng):
+    """销量 / 销售额风格的数值字符串: 61.30M, 705.00K, 1.2亿, 3500万 ..."""
+    v = rng.lognormvariate(15, 1.5)
+    kind = rng.random()
+    if kind < 0.6: return hok_logic.format_to_english_unit(v)
+    if kind < 0.8: return f"{v / 1e4:.0f}万"
+    return f"{v / 1e8:.1f}亿"
+
+
+def _revenue(rng):
+    kind = rng.random()
+    if kind < 0.65: return _money(rng)
+    if kind < 0.75: return ">" + _money(rng)
+    if kind < 0.8: return "<" + _money(rng)
+    if kind < 0.92: return f"{_money(rng)}~{_money(rng)}"
+    return rng.choice(["", "0"])
+
+
+def generate_catalog(n, seed=0):
+    """合成 n 条 v0 结构 (未迁移) 的皮肤数据，字段形态与早期 data.json 一致"""
+    rng = random.Random(seed)
+    skins = []
+    for i in range(n):
+        skin = {
+            "quality": rng.choice(QUALITY_CODES),
+            "name": f"{rng.choice(HEROES)}-{rng.choice(SKIN_WORDS)}·{i}",
+            "is_rerun": rng.random() < 0.1,
+            "growth": round(rng.uniform(-5, 15), 1),
+            "is_new": rng.random() < 0.1,
+            "real_price": rng.choice([6, 60, 89, "128.8", "400.0", "800.0"]),
+            "is_preset": rng.random() < 0.05,
+            "is_discontinued": rng.random() < 0.05,
+            "sales_volume": _money(rng),
+            "revenue": _revenue(rng),
+        }
+        if rng.random() < 0.9: skin["on_leaderboard"] = rng.random() < 0.8
+        if rng.random() < 0.5: skin["is_hidden"] = rng.random() < 0.03
+        if rng.random() < 0.2: skin["score"] = rng.randint(0, 100)  # 旧字段，迁移时删除
+        skins.append(skin)
+    return {"skins": skins}
+
+
+def make_workspace(catalog, avatar_limit=2000):
+    """临时仓库目录：data.json (当前结构版本) + 部分皮肤的头像 / 描述图 + 品质图标 + 头部动图"""
+    root = tempfile.mkdtemp(prefix="hok-bench-")
+    data, _ = hok_schema.migrate(copy.deepcopy(catalog))
+    with open(os.path.join(root, "data.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    for d in ("skin_avatars", "skin_descs", "images", "show"):
+        os.makedirs(os.path.join(root, d))
+    stub = b"GIF89a"  # 无法解码的占位图，资源管线保留原文件
+    for skin in data["skins"][:avatar_limit]:
+        with open(os.path.join(root, "skin_avatars", skin["name"] + ".jpg"), "wb") as f:
+            f.write(stub)
+    for skin in data["skins"][:avatar_limit // 4]:
+        with open(os.path.join(root, "skin_descs", skin["name"] + ".png"), "wb") as f:
+            f.write(stub)
+    for code in QUALITY_CODES[::2]:
+        with open(os.path.join(root, "images", f"{code}.jpg"), "wb") as f:
+            f.write(stub)
+    for i in range(4):
+        with open(os.path.join(root, "show", f"show{i}.gif"), "wb") as f:
+            f.write(stub)
+    return root
+
+
+def _operations(app, catalog):
+    """名称 -> (准备函数, 被测函数)；准备函数返回被测函数的参数元组，其耗时不计入"""
+    one = app.all_skins[len(app.all_skins) // 2]
+    return {
+        "init": (None, hok_logic.SkinSystem),
+        "load_data": (None, app.load_data),
+        "migrate": (lambda: (copy.deepcopy(catalog),), hok_schema.migrate),
+        "save_all": (None, app.save_data),
+        "save_one": (None, lambda: app.save_data(skins=[one])),
+        "active_leaderboard": (None, app.get_active_leaderboard),
+        "scan_images_cold": (lambda: scanner.invalidate() or (), app.scan_local_images),
+        "scan_images_warm": (None, app.scan_local_images),
+        "generate_html": (None, lambda: app.generate_html(force=True)),
+    }
+
+
+def _run(setup, func):
+    args = setup() if setup else ()
+    gc.collect()
+    t = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t
+
+
+def bench_size(n, repeat, seed=0, skip=()):
+    catalog = generate_catalog(n, seed)
+    root = make_workspace(catalog)
+    old_repo = hok_logic.LOCAL_REPO_PATH
+    hok_logic.LOCAL_REPO_PATH = root
+    scanner.invalidate()
+    try:
+        app = hok_logic.SkinSystem()
+        results = {}
+        for name, (setup, func) in _operations(app, catalog).items():
+            if name in skip: continue
+            best = min(_run(setup, func) for _ in range(repeat))
+            # 峰值内存单独测一次 (tracemalloc 本身会拖慢计时)
+            args = setup() if setup else ()
+            tracemalloc.start()
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = {"seconds": best, "ops_per_sec": 1.0 / best if best else float("inf"),
+                             "peak_kib": peak / 1024.0}
+        return results
+    finally:
+        hok_logic.LOCAL_REPO_PATH = old_repo
+        scanner.invalidate()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """返回超过基线 (1 + tolerance) 倍的项目 [(规模, 操作, 指标, 当前, 基线)]"""
+    regressions = []
+    for size, ops in results.items():
+        for name, cur in ops.items():
+            base = baseline.get(size, {}).get(name)
+            if not base: continue
+            for metric in ("seconds", "peak_kib"):
+                if base[metric] > 0 and cur[metric] > base[metric] * (1 + tolerance):
+                    regressions.append((size, name, metric, cur[metric], base[metric]))
+    return regressions
+
+
+def print_report(results):
+    print(f"{'size':>7}  {'operation':<20}{'seconds':>11}{'ops/sec':>12}{'peak KiB':>12}")
+    for size, ops in results.items():
+        for name, r in ops.items():
+            print(f"{size:>7}  {name:<20}{r['seconds']:>11.4f}{r['ops_per_sec']:>12.1f}{r['peak_kib']:>12.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SkinSystem 合成数据性能基准")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="皮肤条数，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最快一次")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'), help="存储模式 (默认 hok_logic.STORAGE_MODE)")
+    parser.add_argument('--skip', default='', help="跳过的操作，逗号分隔 (如 generate_html)")
+    parser.add_argument('--json', help="把结果写成 JSON")
+    parser.add_argument('--baseline', help="与该基线比较，回归超过容差时退出码为 1")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="允许比基线慢 / 多占内存的比例")
+    parser.add_argument('--save-baseline', help="把本次结果保存为基线")
+    args = parser.parse_args(argv)
+
+    if args.storage: hok_logic.STORAGE_MODE = args.storage
+    skip = set(filter(None, args.skip.split(',')))
+    results = {}
+    for n in (int(x) for x in args.sizes.split(',')):
+        results[str(n)] = bench_size(n, args.repeat, args.seed, skip)
+    print_report(results)
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, name, metric, cur, base in regressions:
+            print(f"回归: {size} 条 {name} {metric} {cur:.4g} > 基线 {base:.4g} × {1 + args.tolerance:.2f}")
+        if regressions: return 1
+        print("未超过基线")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
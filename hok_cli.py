@@ -0,0 +1,173 @@
+# ================= 命令行入口 =================
+# 不开 Streamlit 也能批量导入 / 重算 / 生成网页 / 发布，适合定时任务:
+#   python hok_cli.py import updates.csv --recompute --publish
+#   python hok_cli.py --repo D:\hok-rank build --force
+# 每次运行只加载一次数据，所有修改合并为一次落盘
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import hok_logic
+
+# CSV 里读到的都是字符串，这些字段需要转换类型；其余字段 (销量、售价、销售额等) 保持字符串
+_FLOAT_FIELDS = ('growth', 'list_price')
+_TRUE_WORDS = ('1', 'true', 'yes', 'y', '是')
+
+
+def _coerce(field, value):
+    if field in hok_logic.FLAG_FIELDS:
+        return value.strip().lower() in _TRUE_WORDS
+    if field in _FLOAT_FIELDS:
+        return float(value)
+    if field == 'quality':
+        return float(value) if '.' in value else int(value)
+    return value
+
+
+def read_records(path):
+    """
+    读取 CSV (首行为字段名，空单元格表示不修改) 或 JSON (列表 / {"skins": [...]})
+    CSV 有无法转换的单元格时抛出 ValueError，列出全部出错的行号和字段 (一条都不导入)
+    """
+    if path.lower().endswith('.csv'):
+        records, errors = [], []
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                rec = {}
+                for k, v in row.items():
+                    if not k or v in (None, ''): continue
+                    try:
+                        rec[k] = _coerce(k, v)
+                    except ValueError:
+                        errors.append(f"第 {reader.line_num} 行 {k}={v!r}")
+                records.append(rec)
+        if errors:
+            raise ValueError(f"{path}: 无法转换的单元格，未导入任何数据\n  " + "\n  ".join(errors))
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('skins', []) if isinstance(data, dict) else data
+
+
+def _finish(app, args):
+    """修改全部落盘后再生成 / 发布，保证提交的 data.json 是最新的"""
+    if getattr(args, 'publish', False):
+        ok, msg = app.publish(force=args.force)
+    elif getattr(args, 'build', False):
+        ok, msg = app.generate_html(force=args.force)
+    else:
+        return 0
+    print(msg)
+    return 0 if ok else 1
+
+
+def cmd_import(app, args):
+    try:
+        records = read_records(args.file)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    with app.batch():
+        updated, added, missing = app.import_records(records, create=args.create)
+        print(f"导入 {len(records)} 条: 更新 {updated}，新增 {added}，未匹配 {len(missing)}")
+        for name in missing:
+            print(f"  未找到: {name}")
+        if args.recompute:
+            names = None if args.recompute_all else [r['name'] for r in records if r.get('name')]
+            recalc, diff = app.recompute_revenue(names)
+            print(f"重算销售额 {recalc} 条，格式化变动 {diff['name'].nunique()} 条")
+    return _finish(app, args)
+
+
+def cmd_recompute(app, args):
+    with app.batch():
+        recalc, diff = app.recompute_revenue()
+    print(f"重算销售额 {recalc} 条，格式化变动 {diff['name'].nunique()} 条")
+    if args.verbose and len(diff):
+        print(diff.to_string(index=False))
+    return _finish(app, args)
+
+
+def cmd_delete(app, args):
+    with app.batch():
+        missing = [name for name in args.names if not app.delete_skin(name)]
+    print(f"删除 {len(args.names) - len(missing)} 个皮肤")
+    for name in missing:
+        print(f"  未找到: {name}")
+    rc = _finish(app, args)
+    return 1 if missing else rc
+
+
+def cmd_build(app, args):
+    args.build = True
+    return _finish(app, args)
+
+
+def cmd_publish(app, args):
+    args.publish = True
+    return _finish(app, args)
+
+
+def cmd_compact(app, args):
+    ok, msg = app.compact_storage()
+    print(msg)
+    return 0 if ok else 1
+
+
+def _add_output_flags(p):
+    p.add_argument('--build', action='store_true', help="完成后生成网页")
+    p.add_argument('--publish', action='store_true', help="完成后生成网页并推送")
+    p.add_argument('--force', action='store_true', help="忽略内容指纹，强制重新生成 / 推送")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='hok', description="王者荣耀皮肤榜单命令行工具")
+    parser.add_argument('--repo', help=f"数据仓库目录 (默认 {hok_logic.LOCAL_REPO_PATH})")
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'), help="存储模式 (默认 hok_logic.STORAGE_MODE)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', help="从 CSV / JSON 批量导入销量、售价、销售额等更新")
+    p.add_argument('file')
+    p.add_argument('--create', action='store_true', help="不存在的皮肤直接新增")
+    p.add_argument('--recompute', action='store_true', help="导入后对导入的皮肤重算销售额")
+    p.add_argument('--recompute-all', action='store_true', help="配合 --recompute，对全部皮肤重算")
+    _add_output_flags(p)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('recompute', help="强制格式化: 销量转 K/M/B，非锚定销售额按 售价 × 销量 重算")
+    p.add_argument('-v', '--verbose', action='store_true', help="列出有变动的皮肤")
+    _add_output_flags(p)
+    p.set_defaults(func=cmd_recompute)
+
+    p = sub.add_parser('delete', help="按名称删除皮肤")
+    p.add_argument('names', nargs='+')
+    _add_output_flags(p)
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser('build', help="生成网页")
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('publish', help="生成网页并 git 提交推送")
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser('compact', help="把变动日志折叠回 data.json (sqlite 模式: 导出 data.json)")
+    p.set_defaults(func=cmd_compact)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.repo: hok_logic.LOCAL_REPO_PATH = os.path.abspath(args.repo)
+    if args.storage: hok_logic.STORAGE_MODE = args.storage
+    app = hok_logic.SkinSystem()
+    return args.func(app, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# ================= 列式视图 =================
+# 把皮肤列表按列存放：数值列为 numpy 数组，标记列压成位掩码，供 Streamlit 表格直接使用
+
+import numpy as np
+import pandas as pd
+import hok_logic
+
+FLAG_BITS = {field: np.uint8(1 << i) for i, field in enumerate(hok_logic.FLAG_FIELDS)}
+NUMERIC_FIELDS = ('quality', 'growth', 'list_price')
+# 只读的派生列，保存编辑结果前要去掉 (badge_label 可编辑，由调用方换算回标记字段)
+DERIVED_COLUMNS = ['tag', 'quality_name', 'revenue_weight', 'anchor_label']
+# 不放进表格的字段 (嵌套结构)；保存编辑结果时由 SkinSystem.replace_skins 按名称沿用
+NON_TABULAR_FIELDS = ('anchor',)
+
+# 概览标签 / 编辑器角标，按优先级排列
+_TAG_RULES = [('is_hidden', "🚫隐藏"), ('is_pool', "🎲祈愿"), ('is_discontinued', "💀绝版"),
+              ('is_preset', "🕒预设"), ('is_rerun', "🔵返场"), ('is_new', "🟡新品")]
+_BADGE_RULES = [('is_pool', "祈愿"), ('is_discontinued', "绝版"), ('is_preset', "预设"),
+                ('is_rerun', "返场"), ('is_new', "新品")]
+
+
+def _to_float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def frame_to_records(df):
+    """编辑后的 DataFrame -> 记录列表：去掉只读派生列，缺失值 (NaN) 还原为 None"""
+    df = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def _flag_bits(skin):
+    bits = 0
+    for field, bit in FLAG_BITS.items():
+        if skin.get(field, field == 'on_leaderboard'): bits |= int(bit)
+    return bits
+
+
+class SkinColumns:
+    """某一数据版本的列式快照，行顺序与 get_total_skins() 一致"""
+
+    def __init__(self, app, version):
+        self.version = version
+        self.skins = app.get_total_skins()
+        n = len(self.skins)
+        self.revenue_weight = np.fromiter((app.parse_revenue_for_sort(s.get('revenue')) for s in self.skins),
+                                          dtype=np.float64, count=n)
+        self.numeric = {f: np.fromiter((_to_float(s.get(f)) for s in self.skins), dtype=np.float64, count=n)
+                        for f in NUMERIC_FIELDS}
+        self.flags = np.fromiter((_flag_bits(s) for s in self.skins), dtype=np.uint8, count=n)
+        names = {}
+        self.quality_name = [names[q] if q in names else names.setdefault(q, app.quality_name(q))
+                             for q in (s.get('quality') for s in self.skins)]
+        self._frames = {}
+
+    def flag(self, field):
+        return (self.flags & FLAG_BITS[field]) != 0
+
+    @property
+    def active_mask(self):
+        return ~self.flag('is_hidden') & self.flag('on_leaderboard')
+
+    def _labels(self, rules, default):
+        return np.select([self.flag(f) for f, _ in rules], [label for _, label in rules], default=default)
+
+    def _build_frame(self):
+        cols = {}
+        for field in hok_logic.SKIN_FIELDS:
+            if field in NON_TABULAR_FIELDS: continue
+            if field in self.numeric:
+                cols[field] = self.numeric[field]
+            elif field in FLAG_BITS:
+                cols[field] = self.flag(field)
+            else:
+                cols[field] = [s.get(field) for s in self.skins]
+        cols['tag'] = self._labels(_TAG_RULES, "")
+        cols['badge_label'] = self._labels(_BADGE_RULES, "无")
+        cols['quality_name'] = self.quality_name
+        cols['revenue_weight'] = self.revenue_weight
+        cols['anchor_label'] = [hok_logic.anchor_label(s.get('anchor')) for s in self.skins]
+        return pd.DataFrame(cols, index=pd.RangeIndex(1, len(self.skins) + 1))
+
+    def frame(self, active=False):
+        """缓存的 DataFrame (序号从 1 开始)；调用方不要原地修改"""
+        key = 'active' if active else 'all'
+        if key not in self._frames:
+            if 'all' not in self._frames: self._frames['all'] = self._build_frame()
+            if active:
+                df = self._frames['all'][self.active_mask]
+                df.index = range(1, len(df) + 1)
+                self._frames['active'] = df
+        return self._frames[key]
+
+
+# ================= 批量重算 =================
+# Tab 4 "强制格式化" / 命令行 recompute 的列式实现：每列相同的字符串只解析一次，乘积与 K/M/B 格式化按列计算
+
+def _mean_column(values):
+    """一列数值字符串 -> float64 数组 (范围取中值，缺失 / 无法解析为 0)"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    means = np.fromiter((hok_logic.revenue_mean(u) for u in uniques), dtype=np.float64, count=len(uniques))
+    return np.where(codes >= 0, means[codes] if len(means) else 0.0, 0.0)
+
+
+def _anchored_column(values):
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    anchored = np.fromiter((hok_logic.is_anchored(u) for u in uniques), dtype=bool, count=len(uniques))
+    return (codes >= 0) & (anchored[codes] if len(anchored) else False)
+
+
+def format_units(x):
+    """hok_logic.format_to_english_unit 的列式版本，x 为非负 float64 数组 (相同数值只格式化一次)"""
+    codes, x = pd.factorize(x)
+    out = np.empty(len(x), dtype=object)
+    upper = np.inf
+    for base, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        mask = (x >= base) & (x < upper)
+        if mask.any(): out[mask] = np.char.add(np.char.mod('%.2f', x[mask] / base), suffix)
+        upper = base
+    small = x < 1e3
+    out[small] = [hok_logic.format_to_english_unit(v) for v in x[small].tolist()]
+    return out[codes]
+
+
+def recompute(items):
+    """
+    对一批记录 (皮肤或字典) 执行强制格式化，原地修改有变化的记录:
+    - 销量 > 0 时统一格式化为 K/M/B
+    - 售价、销量都 > 0 且销售额不是锚定值 (>, <, ~) 时，销售额 = 售价 × 销量
+    返回 (重算销售额的条数, 变动明细 DataFrame[name, field, old, new])
+    """
+    n = len(items)
+    if not n: return 0, pd.DataFrame(columns=['name', 'field', 'old', 'new'])
+    old_sales = np.empty(n, dtype=object)
+    old_sales[:] = [s.get('sales_volume', '0') for s in items]
+    old_rev = np.empty(n, dtype=object)
+    old_rev[:] = [s.get('revenue', '') for s in items]
+    price = _mean_column([s.get('real_price', '0') for s in items])
+    sales = _mean_column(old_sales)
+
+    has_sales = sales > 0
+    recalc = has_sales & (price > 0) & ~_anchored_column(old_rev)
+    new_sales = old_sales.copy()
+    new_sales[has_sales] = format_units(sales[has_sales])
+    new_rev = old_rev.copy()
+    new_rev[recalc] = format_units(price[recalc] * sales[recalc])
+
+    names = np.empty(n, dtype=object)
+    names[:] = [s.get('name') for s in items]
+    parts = []
+    for field, old, new in (('sales_volume', old_sales, new_sales), ('revenue', old_rev, new_rev)):
+        idx = np.flatnonzero(old != new)
+        for i, value in zip(idx.tolist(), new[idx].tolist()):
+            items[i][field] = value
+        parts.append(pd.DataFrame({'name': names[idx], 'field': field, 'old': old[idx], 'new': new[idx]}))
+    return int(recalc.sum()), pd.concat(parts, ignore_index=True)
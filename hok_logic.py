@@ -1,79 +1,633 @@
 import json
-import os
 import math
+import os
 import subprocess
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import random
 import re
+import functools
+import tempfile
+import bisect
+import hashlib
+import heapq
+from collections import namedtuple, deque
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from datetime import datetime
-from jinja2 import Template
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
 import hok_templates
+import hok_storage
+import hok_schema
+import hok_assets
+import hok_profile
+from hok_assets import scanner
 
 # ================= 配置区域 =================
 LOCAL_REPO_PATH = r"D:\python-learn\hok-rank"
 GIT_EXECUTABLE_PATH = r"D:\Git\bin\git.exe"
 GITHUB_USERNAME = "hok11"
 LEADERBOARD_CAPACITY = 20
+REVENUE_CACHE_SIZE = 8192  # 营收解析缓存上限 (按不同字符串计)
+# 头像爬虫: 搜索接口 / 并发数 / 每秒请求数 / 失败重试次数
+IMAGE_SEARCH_URL = "https://image.baidu.com/search/acjson"
+CRAWL_CONCURRENCY = 4
+CRAWL_RATE = 2.0
+CRAWL_RETRIES = 3
+CRAWL_MANIFEST = "crawl_manifest.json"  # 爬取记录 (相对仓库根目录)
+CRAWL_FAIL_TTL = 24 * 3600  # 未找到图片后多久再重试 (秒)，连续失败时翻倍，最长 7 天
+# 存储模式 - json: 整体重写 data.json; journal: 追加写 data.journal.jsonl，定期压缩回快照;
+# sqlite: 逐行存 data.sqlite3 (首次从 data.json 导入，压缩 / 导出时写回 data.json)
+STORAGE_MODE = "json"
+# 加载时的数据校验: "fast" 只看顶层结构 / "full" 逐条检查字段类型 / "off" 不校验
+# 校验不通过时按旧版本数据重新迁移一遍
+DATA_VALIDATION = "fast"
+# 上次生成 / 推送的网页内容指纹，输入没变时跳过渲染和 git
+BUILD_STAMP = "build_stamp.json"
+# 网页引用的图片缩放 / 转码后以内容哈希命名写到这里 (需 Pillow，没有时只复制)
+ASSET_OUT_DIR = "assets"
+ASSET_MANIFEST = "asset_manifest.json"
+# 品质图标处理后不超过该字节数时直接内联为 data URI (每行都会重复一份，0 表示不内联)
+INLINE_ICON_MAX_BYTES = 0
+# 网页渲染方式: "table" 所有行直接写进 HTML；"virtual" 行数据写成 JSON，页面虚拟滚动只渲染可见行 (适合几千条以上)
+RENDER_MODE = "table"
+
+# ================= 营收数值解析 =================
+# low/high: 数值区间 (单值时两者相等); bound: exact/gt/lt/range/empty/invalid; weight: 排序权重
+RevenueValue = namedtuple('RevenueValue', ['low', 'high', 'bound', 'weight'])
+
+_UNIT_MULTIPLIERS = {'亿': 100000000.0, 'B': 100000000.0, '万': 10000.0, 'W': 10000.0, 'M': 1000000.0, 'K': 1000.0}
+_BOUND_KINDS = {'>': 'gt', '》': 'gt', '<': 'lt', '《': 'lt'}
+_NUM = r'([-+]?(?:\d+\.?\d*|\.\d+)(?:E[-+]?\d+)?)\s*(亿|万|B|W|M|K)?'
+# 一次匹配: [比较符] 数值[单位] [~ [比较符] 数值[单位]]
+_REVENUE_RE = re.compile(r'^([><》《≈]*)\s*' + _NUM + r'(?:\s*~\s*[><》《≈]*\s*' + _NUM + r')?$')
+
+_EMPTY_REVENUE = RevenueValue(0.0, 0.0, 'empty', -1.0)
+_INVALID_REVENUE = RevenueValue(0.0, 0.0, 'invalid', 0.0)
+
+
+def _scale(num, unit):
+    return float(num) * _UNIT_MULTIPLIERS.get(unit, 1.0)
+
+
+@functools.lru_cache(maxsize=REVENUE_CACHE_SIZE)
+def parse_revenue(raw):
+    """将营收字符串解析为 RevenueValue，同一字符串只解析一次"""
+    s = raw.upper().replace('¥', '').replace(',', '').strip()
+    if not s: return _EMPTY_REVENUE
+    m = _REVENUE_RE.match(s)
+    if not m: return _INVALID_REVENUE
+
+    ops, a, ua, b, ub = m.groups()
+    v1 = _scale(a, ua)
+    # 1. 范围型: A~B (取平均)
+    if b is not None:
+        v2 = _scale(b, ub)
+        return RevenueValue(min(v1, v2), max(v1, v2), 'range', (v1 + v2) / 2.0)
+
+    bound = _BOUND_KINDS.get(ops[:1], 'exact')
+    # 2. 大于型: >A 排在同数值前面; 3. 小于型: <A 排在同数值后面
+    if bound == 'gt': return RevenueValue(v1, v1, bound, v1 + 0.0001)
+    if bound == 'lt': return RevenueValue(v1, v1, bound, v1 - 0.0001)
+    return RevenueValue(v1, v1, bound, v1)
+
+
+def revenue_mean(val):
+    """单个数值字符串 -> 浮点数 (范围取中值，支持中文/英文单位)"""
+    if val is None: return 0.0
+    rv = parse_revenue(str(val))
+    return (rv.low + rv.high) / 2.0
+
+
+# --- 🛠️ 强制英文单位格式化工具 (K/M/B) ---
+def format_to_english_unit(val):
+    if val is None or (isinstance(val, float) and math.isnan(val)):
+        return "0"
+    try:
+        f_val = float(val)
+        if f_val >= 1000000000:
+            return f"{f_val / 1000000000:.2f}B"
+        elif f_val >= 1000000:
+            return f"{f_val / 1000000:.2f}M"
+        elif f_val >= 1000:
+            return f"{f_val / 1000:.2f}K"
+        else:
+            return str(int(f_val)) if f_val.is_integer() else str(round(f_val, 2))
+    except:
+        return str(val)
+
+
+def is_anchored(revenue):
+    """锚定值 (>A / <A / A~B) 是手工给出的，重算时不覆盖"""
+    rev = str(revenue if revenue is not None else '')
+    return '>' in rev or '~' in rev or '<' in rev
+
+
+def _revenue_side(revenue, side=None):
+    """引用皮肤的销售额去掉比较符；范围值按 side 取下端 ('low') / 上端 ('high')，None 保留整个范围"""
+    text = str(revenue if revenue is not None else '').strip().lstrip('><》《≈').strip()
+    if '~' in text and side:
+        low, high = text.split('~', 1)
+        text = (low if side == 'low' else high).strip().lstrip('><》《≈').strip()
+    return text or "0"
+
+
+def anchor_revenue(anchor, revenue_of):
+    """
+    按锚定计算销售额文本，revenue_of(name) 返回引用皮肤的销售额 (不存在时 None)
+    >A 取 A 的上端、<A 取 A 的下端、A~B 取 A 的上端到 B 的下端；引用缺失返回 None
+    """
+    if 'ref' in anchor:
+        rev = revenue_of(anchor['ref'])
+        if rev is None: return None
+        op = anchor['op']
+        return op + _revenue_side(rev, {'>': 'high', '<': 'low'}.get(op))
+    lo, hi = revenue_of(anchor['lo']), revenue_of(anchor['hi'])
+    if lo is None or hi is None: return None
+    return f"{_revenue_side(lo, 'high')}~{_revenue_side(hi, 'low')}"
+
+
+def anchor_label(anchor):
+    """锚定的简短说明 (编辑器只读列)"""
+    if not anchor: return ""
+    if 'ref' in anchor: return f"{anchor['op']} {anchor['ref']}"
+    return f"{anchor['lo']} ~ {anchor['hi']}"
+
+
+
+# ================= 网页模板 =================
+# 模板只编译一次；字节码缓存放在系统临时目录，Streamlit 重启后也不用重新编译
+TEMPLATE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "hok-rank-jinja")
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+TEMPLATE_ENV = Environment(loader=DictLoader({'index.html': hok_templates.HTML_TEMPLATE,
+                                               'virtual.html': hok_templates.VIRTUAL_TEMPLATE,
+                                               'row.html': hok_templates.ROW_TEMPLATE}),
+                           bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR), auto_reload=False)
+TEMPLATE_DIGEST = hashlib.sha1((hok_templates.HTML_TEMPLATE + hok_templates.ROW_TEMPLATE +
+                                hok_templates.VIRTUAL_TEMPLATE).encode('utf-8')).hexdigest()
+
+# 行视图：模板循环里只读取现成的值，不再查品质配置
+QualityView = namedtuple('QualityView', ['key', 'name', 'scale', 'bg_color', 'cls', 'icon', 'root'])
+RowView = namedtuple('RowView', ['name', 'quality', 'q', 'ranked', 'avatar', 'badge', 'desc', 'sales_volume',
+                                 'revenue', 'growth', 'growth_cls', 'list_price', 'real_price',
+                                 # 可排序列的数值，输出到 data-v 供页面排序
+                                 'quality_v', 'sales_v', 'revenue_v', 'growth_v', 'real_v',
+                                 'active'])  # 是否在榜 (on_leaderboard)
+
+# 角标按优先级: (标记字段, css 类, 文案)
+_BADGES = [('is_pool', 'badge-pool', '祈愿'), ('is_discontinued', 'badge-out', 'Out of Print'),
+           ('is_preset', 'badge-preset', 'Coming Soon'), ('is_new', 'badge-new', 'New Arrival'),
+           ('is_rerun', 'badge-return', 'Limit Return')]
+
+
+def _growth_class(growth):
+    try:
+        if growth == 1.9: return 'growth-special'
+        if growth < 0: return 'growth-down'
+        if growth >= 10: return 'growth-up-high'
+        if growth >= 5: return 'growth-up-mid'
+    except TypeError:
+        pass
+    return ''
+
+
+def _float_or_zero(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _int_or_zero(val):
+    try:
+        return int(float(val))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _writer(method):
+    """SkinSystem 写操作: 持有实例锁 (同一时刻只有一个会话在改)，期间的修改合并为一次落盘"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.batch():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# ================= 皮肤记录 =================
+# 字段顺序即 data.json 中的键顺序
+SKIN_FIELDS = ('quality', 'name', 'is_rerun', 'growth', 'is_new', 'local_img', 'real_price', 'list_price',
+               'on_leaderboard', 'is_preset', 'is_discontinued', 'desc_img', 'quality_key', 'sales_volume',
+               'revenue', 'is_hidden', 'is_pool', 'anchor')
+FLAG_FIELDS = tuple(hok_schema.FLAG_DEFAULTS)
+_SKIN_SLOTS = frozenset(SKIN_FIELDS)
+
+
+class Skin(MutableMapping):
+    """
+    皮肤记录：已知字段存在 __slots__ 里 (比 dict 省内存)，未知的旧字段放进 _extra
+    保留 dict 式用法 (skin['name'] / skin.get / 'x' in skin / del)，未赋值的字段视为不存在
+    """
+    __slots__ = SKIN_FIELDS + ('_extra',)
+
+    def __init__(self, data=None, **kwargs):
+        self._extra = None
+        if data: self.update(data)
+        if kwargs: self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        return data if isinstance(data, cls) else cls(data)
+
+    def __getitem__(self, key):
+        if key in _SKIN_SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra and key in self._extra: return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _SKIN_SLOTS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None: self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _SKIN_SLOTS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for k in SKIN_FIELDS:
+            if hasattr(self, k): yield k
+        if self._extra: yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in _SKIN_SLOTS: return hasattr(self, key)
+        return bool(self._extra) and key in self._extra
+
+    def get(self, key, default=None):
+        if key in _SKIN_SLOTS: return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra else default
+
+    def to_dict(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"Skin({self.to_dict()!r})"
+
+
+class TokenBucket:
+    """令牌桶限速：平均每秒 rate 次，最多攒 capacity 次突发；rate <= 0 表示不限速"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CrawlManifest:
+    """
+    爬取清单: 关键词 -> 图片地址 / ETag / Last-Modified / 内容哈希 / 时间 / 连续失败次数
+    联网前先查这里：已知图片地址就跳过搜索，已知未找到且未过期就直接跳过
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except:
+                self.entries = {}
+
+    def get(self, keyword):
+        with self.lock:
+            return dict(self.entries.get(keyword) or {})
+
+    def retry_in(self, entry):
+        """已知失败时距离允许重试还有多少秒 (0 表示可以联网)"""
+        if not entry.get('failures'): return 0
+        ttl = min(CRAWL_FAIL_TTL * 2 ** (entry['failures'] - 1), 7 * 24 * 3600)
+        return max(0, entry.get('ts', 0) + ttl - time.time())
+
+    def update(self, keyword, **info):
+        with self.lock:
+            entry = self.entries.setdefault(keyword, {})
+            entry.update(info)
+            entry['ts'] = time.time()
+            self.dirty = True
+
+    def record_failure(self, keyword):
+        with self.lock:
+            entry = self.entries.setdefault(keyword, {})
+            entry['failures'] = entry.get('failures', 0) + 1
+            entry['ts'] = time.time()
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            text = json.dumps(self.entries, ensure_ascii=False, indent=1)
+            self.dirty = False
+        hok_storage.atomic_write(self.path, text)
 
 
 class SkinCrawler:
-    def __init__(self, data_path):
+    def __init__(self, data_path, search_url=None, concurrency=None, rate=None, retries=None):
+        self.data_path = data_path
         self.save_dir = os.path.join(data_path, "skin_avatars")
         if not os.path.exists(self.save_dir):
             os.makedirs(self.save_dir)
+        self.search_url = search_url or IMAGE_SEARCH_URL
+        self.concurrency = concurrency or CRAWL_CONCURRENCY
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/plain, */*; q=0.01', 'Referer': 'https://image.baidu.com/search/index',
         }
+        # 复用连接池；连接错误 / 429 / 5xx 按指数退避重试
+        retry = Retry(total=CRAWL_RETRIES if retries is None else retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.limiter = TokenBucket(CRAWL_RATE if rate is None else rate)
+        self.manifest = CrawlManifest(os.path.join(data_path, CRAWL_MANIFEST))
 
-    def fetch_single_image(self, skin):
-        safe_name = skin['name'].replace("/", "_").replace("\\", "_").replace(" ", "")
+    def _get(self, url, **kwargs):
+        self.limiter.acquire()
+        return self.session.get(url, **kwargs)
+
+    def fetch_single_image(self, skin, refresh=False):
+        result = self._fetch_one(skin, refresh)
+        self.manifest.save()
+        return result
+
+    def _download(self, keyword, img_url, file_path, entry):
+        """下载图片；refresh 时带 If-None-Match / If-Modified-Since，内容未变不重写文件"""
+        headers = {}
+        if entry.get('thumb_url') == img_url and scanner.exists(file_path):
+            if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+        img_resp = self._get(img_url, headers=headers, timeout=10)
+        if img_resp.status_code == 304:
+            self.manifest.update(keyword, thumb_url=img_url, failures=0)
+            return False
+        img_resp.raise_for_status()
+        digest = hashlib.sha1(img_resp.content).hexdigest()
+        changed = digest != entry.get('sha1') or not scanner.exists(file_path)
+        if changed:
+            with open(file_path, 'wb') as f:
+                f.write(img_resp.content)
+            scanner.invalidate(self.save_dir)
+        self.manifest.update(keyword, thumb_url=img_url, etag=img_resp.headers.get('ETag'),
+                             last_modified=img_resp.headers.get('Last-Modified'), sha1=digest,
+                             file=os.path.basename(file_path), failures=0)
+        return changed
+
+    def _fetch_one(self, skin, refresh=False):
+        safe_name = hok_assets.safe_name(skin['name'])
         gif_filename = f"{safe_name}.gif"
-        gif_path = os.path.join(self.save_dir, gif_filename)
 
-        if os.path.exists(gif_path):
+        if scanner.by_stem(self.save_dir, ('.gif',)).get(safe_name) == gif_filename:
             current_path = f"skin_avatars/{gif_filename}"
             if skin.get('local_img') != current_path:
                 skin['local_img'] = current_path
                 return True, f"锁定本地动态头像: {gif_filename}"
             return True, "已存在本地动态头像"
 
-        if skin.get('local_img') and os.path.exists(os.path.join(LOCAL_REPO_PATH, skin['local_img'])):
-            return True, "已存在图片"
-
         parts = skin['name'].split('-')
         keyword = f"{parts[1]} {parts[0]}" if len(parts) >= 2 else skin['name']
-        url = "https://image.baidu.com/search/acjson"
-        params = {
-            "tn": "resultjson_com", "ipn": "rj", "fp": "result", "queryWord": keyword, "cl": "2", "lm": "-1",
-            "ie": "utf-8", "oe": "utf-8", "word": keyword, "pn": "0", "rn": "1"
-        }
+        entry = self.manifest.get(keyword)
+
+        if skin.get('local_img') and scanner.exists(os.path.join(self.data_path, skin['local_img'])):
+            if not (refresh and entry.get('thumb_url')):
+                return True, "已存在图片"
+
+        wait = self.manifest.retry_in(entry)
+        if wait > 0:
+            return False, f"跳过 (已知未找到，{wait / 3600:.1f} 小时后重试): {keyword}"
+
+        file_name = f"{safe_name}.jpg"
+        file_path = os.path.join(self.save_dir, file_name)
         try:
-            resp = requests.get(url, headers=self.headers, params=params, timeout=5)
+            img_url = entry.get('thumb_url')
+            if not img_url:
+                params = {
+                    "tn": "resultjson_com", "ipn": "rj", "fp": "result", "queryWord": keyword, "cl": "2", "lm": "-1",
+                    "ie": "utf-8", "oe": "utf-8", "word": keyword, "pn": "0", "rn": "1"
+                }
+                resp = self._get(self.search_url, params=params, timeout=5)
+                try:
+                    data = resp.json()
+                except:
+                    data = json.loads(resp.text.replace(r"\'", r"'"))
+
+                if 'data' in data and len(data['data']) > 0 and 'thumbURL' in data['data'][0]:
+                    img_url = data['data'][0]['thumbURL']
+                    if not img_url and 'replaceUrl' in data['data'][0]:
+                        img_url = data['data'][0]['replaceUrl'][0]['ObjURL']
+
+            if not img_url:
+                self.manifest.record_failure(keyword)
+                return False, f"未找到图片: {keyword}"
+
             try:
-                data = resp.json()
-            except:
-                data = json.loads(resp.text.replace(r"\'", r"'"))
-
-            if 'data' in data and len(data['data']) > 0 and 'thumbURL' in data['data'][0]:
-                img_url = data['data'][0]['thumbURL']
-                if not img_url and 'replaceUrl' in data['data'][0]:
-                    img_url = data['data'][0]['replaceUrl'][0]['ObjURL']
-
-                if img_url:
-                    img_resp = requests.get(img_url, headers=self.headers, timeout=10)
-                    file_name = f"{safe_name}.jpg"
-                    file_path = os.path.join(self.save_dir, file_name)
-                    with open(file_path, 'wb') as f:
-                        f.write(img_resp.content)
-                    skin['local_img'] = f"skin_avatars/{file_name}"
-                    time.sleep(random.uniform(0.5, 1.0))
-                    return True, f"下载成功: {file_name}"
-            return False, f"未找到图片: {keyword}"
+                changed = self._download(keyword, img_url, file_path, entry)
+            except requests.HTTPError:
+                # 记录的地址失效，清掉以便下次重新搜索
+                self.manifest.update(keyword, thumb_url=None, etag=None, last_modified=None)
+                raise
+            skin['local_img'] = f"skin_avatars/{file_name}"
+            return True, f"下载成功: {file_name}" if changed else f"图片未变化: {file_name}"
         except Exception as e:
             return False, f"爬取错误: {str(e)}"
 
+    def fetch_many(self, skins, concurrency=None, refresh=False):
+        """
+        批量补全头像：线程池并发 + 令牌桶限速，refresh=True 时对已有图片做条件请求
+        返回报告 {'ok': [(name, msg)], 'failed': [(name, msg)], 'elapsed': 秒}
+        """
+        start = time.monotonic()
+        report = {'ok': [], 'failed': [], 'elapsed': 0.0}
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency or self.concurrency) as pool:
+                results = pool.map(lambda s: self._fetch_one(s, refresh), skins)
+                for skin, (ok, msg) in zip(skins, results):
+                    report['ok' if ok else 'failed'].append((skin['name'], msg))
+        finally:
+            self.manifest.save()
+        report['elapsed'] = time.monotonic() - start
+        return report
+
+
+# 预解析后的品质条目: price 已沿父级链补全, root 为最顶层父级, bg_color 取自 root
+QualityEntry = namedtuple('QualityEntry', ['key', 'name', 'price', 'parent', 'root', 'root_name', 'scale', 'bg_color'])
+
+
+class QualityIndex:
+    """品质代码索引：代码规范化 + 父级链预解析，查询为 O(1) 字典查找"""
+
+    def __init__(self, quality_config):
+        self.entries = {}
+        self._by_float = {}
+        self._memo = {}
+        for k in quality_config:
+            try:
+                self._by_float.setdefault(float(k), k)
+            except (TypeError, ValueError):
+                pass
+        for k, cfg in quality_config.items():
+            self.entries[k] = self._build_entry(k, cfg, quality_config)
+
+    @staticmethod
+    def _parent_of(cfg):
+        return str(cfg['parent']) if cfg.get('parent') else None
+
+    def _build_entry(self, key, cfg, config):
+        root_key, root_cfg = key, cfg
+        price = cfg.get('price', 0.0)
+        seen = {key}
+        p_key = self._parent_of(cfg)
+        while p_key and p_key in config and p_key not in seen:
+            seen.add(p_key)
+            root_key, root_cfg = p_key, config[p_key]
+            if price <= 0: price = root_cfg.get('price', 0.0)
+            p_key = self._parent_of(root_cfg)
+        return QualityEntry(key, cfg.get('name'), price, self._parent_of(cfg), root_key, root_cfg.get('name'),
+                            cfg.get('scale', 1.0), root_cfg.get('bg_color', '#ffffff'))
+
+    def _normalize(self, code):
+        q_str = str(code)
+        if q_str in self.entries: return q_str
+        if q_str.endswith('.0') and q_str[:-2] in self.entries: return q_str[:-2]
+        try:
+            return self._by_float.get(float(code))
+        except (TypeError, ValueError):
+            return None
+
+    def key_for(self, code):
+        """返回规范化后的品质代码 (如 5000.0 -> "5000", "50.10" -> "50.1")，未知代码返回 None"""
+        try:
+            return self._memo[code]
+        except KeyError:
+            key = self._memo[code] = self._normalize(code)
+            return key
+        except TypeError:
+            return self._normalize(code)
+
+    def resolve(self, code):
+        key = self.key_for(code)
+        return self.entries.get(key) if key is not None else None
+
+
+class RankedIndex:
+    """
+    按排名键 (是否隐藏, -销售额权重, 序号) 排好序的皮肤容器
+    单条皮肤变动时用 bisect 定位后移动，不再整表排序；序号保持并列皮肤原来的先后 (与稳定排序一致)
+    批量变动或加载后标记失效，下次整体访问时重建
+    """
+    BULK_RATIO = 16  # 一次变动超过总数的 1/16 时直接失效重建，比逐条移动便宜
+
+    def __init__(self, key_func):
+        self.key_func = key_func
+        self.keys = []
+        self.skins = []
+        self._key_of = {}  # id(skin) -> 排名键
+        self._seq = 0
+        self.valid = False
+
+    def __len__(self):
+        return len(self.skins)
+
+    def invalidate(self):
+        self.valid = False
+
+    def rebuild(self, skins):
+        decorated = sorted((self.key_func(s) + (i,), s) for i, s in enumerate(skins))
+        self.keys = [k for k, _ in decorated]
+        self.skins = [s for _, s in decorated]
+        self._key_of = {id(s): k for k, s in decorated}
+        self._seq = len(decorated)
+        self.valid = True
+
+    def _pop(self, skin):
+        key = self._key_of.pop(id(skin), None)
+        if key is not None:
+            i = bisect.bisect_left(self.keys, key)
+            del self.keys[i]
+            del self.skins[i]
+        return key
+
+    def update(self, skins):
+        """皮肤的销售额 / 隐藏标记可能变了 (或是新皮肤)：逐条重新定位；索引已失效时什么都不做"""
+        if not self.valid: return
+        if len(skins) * self.BULK_RATIO > len(self.skins):
+            self.valid = False
+            return
+        for skin in skins:
+            key = self.key_func(skin)
+            old = self._key_of.get(id(skin))
+            if old is not None and old[:-1] == key: continue
+            if old is None:
+                seq, self._seq = self._seq, self._seq + 1
+            else:
+                seq = old[-1]
+                self._pop(skin)
+            key += (seq,)
+            i = bisect.bisect_left(self.keys, key)
+            self.keys.insert(i, key)
+            self.skins.insert(i, skin)
+            self._key_of[id(skin)] = key
+
+    def remove(self, skin):
+        if self.valid: self._pop(skin)
+
+    def first(self, n, pred):
+        """按排名取前 n 个满足 pred 的皮肤"""
+        out = []
+        if n <= 0: return out
+        for skin in self.skins:
+            if pred(skin):
+                out.append(skin)
+                if len(out) == n: break
+        return out
+
 
 class SkinSystem:
     def __init__(self):
@@ -101,92 +655,111 @@ class SkinSystem:
         self.data_file = os.path.join(LOCAL_REPO_PATH, "data.json")
         self.desc_dir = os.path.join(LOCAL_REPO_PATH, "skin_descs")
         self.avatar_dir = os.path.join(LOCAL_REPO_PATH, "skin_avatars")
+        self.build_stamp_path = os.path.join(LOCAL_REPO_PATH, BUILD_STAMP)
+        self.assets = hok_assets.AssetPipeline(LOCAL_REPO_PATH, ASSET_OUT_DIR,
+                                               os.path.join(LOCAL_REPO_PATH, ASSET_MANIFEST))
 
         if not os.path.exists(self.desc_dir): os.makedirs(self.desc_dir)
         if not os.path.exists(self.avatar_dir): os.makedirs(self.avatar_dir)
 
+        self.store = hok_storage.open_store(STORAGE_MODE, self.data_file, weight=self.parse_revenue_for_sort)
+        self._batch_depth = 0
+        self._version = 0  # 每次数据变动 +1，供列式视图判断是否需要重建
+        self._by_name = {}  # name -> skin (重名时保留第一个)
+        self._sorted_names = []
+        self.ranked = RankedIndex(self._get_sort_key)  # 全部皮肤的排名 (单条变动增量维护)
+        self._dependents = {}  # 锚定依赖图: 被引用的皮肤名 -> 锚定在它上面的皮肤名集合
+        self._refs_of = {}  # 皮肤名 -> 它的锚定引用的皮肤名元组
+        self._columns = None
+        self._disk_sig = None  # 最近一次读 / 写后数据文件的签名
+        self._load_error = None  # 最近一次加载失败的异常；此时不写盘，以免空数据覆盖原文件
+        self.schema_version = hok_schema.SCHEMA_VERSION
+        # 多个 Streamlit 会话共用一个实例：写操作都在这把锁内进行 (可重入，batch 嵌套时同一线程不会自锁)
+        self.lock = threading.RLock()
+
         self.crawler = SkinCrawler(LOCAL_REPO_PATH)
-        self.load_data()
+        self._load_all()
 
-        for k, v in self.default_quality_config.items():
-            if k in self.quality_config:
-                self.quality_config[k]['price'] = v['price']
-            else:
-                self.quality_config[k] = v
+    def _load_all(self):
+        """加载数据并补齐默认配置"""
+        with self.batch():
+            migrated = self.load_data()
+            self._version += 1
 
-        self.scan_local_images()
-        self._migrate_data_structure()
+            prices = {k: v.get('price') for k, v in self.quality_config.items()}
+            for k, v in self.default_quality_config.items():
+                if k in self.quality_config:
+                    self.quality_config[k]['price'] = v['price']
+                else:
+                    self.quality_config[k] = v
+            if self._load_error is None: self.store.mark_dirty(sections=['quality_config'])
+            self.rebuild_quality_index()
+
+            self.scan_local_images()
+            self._resolve_anchors()
+            if migrated or prices != {k: v.get('price') for k, v in self.quality_config.items()}:
+                self._refresh_list_prices()
+
+    def reload_if_stale(self):
+        """数据文件被其他进程 (如命令行定时任务) 改过时重新加载，返回是否重新加载；未变时只有一次 stat"""
+        if self.store.signature() == self._disk_sig: return False
+        with self.lock:
+            if self.store.signature() == self._disk_sig: return False
+            self._load_all()
+            return True
 
     def scan_local_images(self):
-        updates = 0
+        avatars = scanner.by_stem(self.avatar_dir, hok_assets.AVATAR_EXTS)
+        updated = []
         for skin in self.all_skins:
-            current_img = skin.get('local_img')
-            safe_name = skin['name'].replace("/", "_").replace("\\", "_").replace(" ", "")
-            found_path = None
-            for ext in ['.gif', '.jpg', '.png', '.jpeg']:
-                file_name = f"{safe_name}{ext}"
-                full_path = os.path.join(self.avatar_dir, file_name)
-                if os.path.exists(full_path):
-                    found_path = f"skin_avatars/{file_name}"
-                    break
-
-            if found_path and current_img != found_path:
+            file_name = avatars.get(hok_assets.safe_name(skin['name']))
+            found_path = f"skin_avatars/{file_name}" if file_name else None
+            if found_path and skin.get('local_img') != found_path:
                 skin['local_img'] = found_path
-                updates += 1
-        return updates
+                updated.append(skin)
+        if updated: self._touch(skins=updated)
+        return len(updated)
+
+    def rebuild_quality_index(self):
+        """quality_config 变动后必须调用 (加载 / 新增修改 / 删除)"""
+        self.quality_index = QualityIndex(self.quality_config)
+
+    @_writer
+    def set_quality(self, code, cfg):
+        self.quality_config[code] = cfg
+        self.rebuild_quality_index()
+        self.save_data(sections=['quality_config'])
+        self._refresh_list_prices()
+
+    @_writer
+    def delete_qualities(self, codes):
+        for code in codes:
+            self.quality_config.pop(code, None)
+        self.rebuild_quality_index()
+        self.save_data(sections=['quality_config'])
+        self._refresh_list_prices()
+
+    def _refresh_list_prices(self):
+        """品质价格变动后同步各皮肤的 list_price"""
+        changed = []
+        for skin in self.all_skins:
+            price = self._get_list_price_by_quality(skin['quality'])
+            if skin.get('list_price') != price:
+                skin['list_price'] = price
+                changed.append(skin)
+        if changed: self.save_data(skins=changed)
+
+    def quality_name(self, q_code, default="未知"):
+        entry = self.quality_index.resolve(q_code)
+        return entry.name if entry else default
 
     def _get_list_price_by_quality(self, q_code):
-        q_str = str(q_code)
-        if q_str in self.quality_config:
-            return self.quality_config[q_str]['price']
-        if q_str.endswith(".0"):
-            q_clean = q_str[:-2]
-            if q_clean in self.quality_config:
-                return self.quality_config[q_clean]['price']
-        try:
-            target_val = float(q_code)
-            for k, v in self.quality_config.items():
-                try:
-                    if math.isclose(float(k), target_val, rel_tol=1e-9):
-                        price = v['price']
-                        if price <= 0 and v.get('parent'):
-                            p_key = str(v['parent'])
-                            if p_key in self.quality_config:
-                                return self.quality_config[p_key]['price']
-                        return price
-                except:
-                    continue
-        except:
-            pass
-        return 0.0
+        entry = self.quality_index.resolve(q_code)
+        return entry.price if entry else 0.0
 
     def parse_revenue_str(self, val):
         """解析单个数值字符串为浮点数 (支持中文/英文)"""
-        if val is None: return 0.0
-        s = str(val).upper().replace('¥', '').replace(',', '').strip()
-        if not s: return 0.0
-
-        multiplier = 1.0
-        # 移除比较符号进行纯数值解析
-        s = s.replace('>', '').replace('<', '').replace('~', '')
-
-        if '亿' in s or 'B' in s:
-            multiplier = 100000000.0
-            s = s.replace('亿', '').replace('B', '')
-        elif '万' in s or 'W' in s:
-            multiplier = 10000.0
-            s = s.replace('万', '').replace('W', '')
-        elif 'M' in s:
-            multiplier = 1000000.0
-            s = s.replace('M', '')
-        elif 'K' in s:
-            multiplier = 1000.0
-            s = s.replace('K', '')
-
-        try:
-            return float(s) * multiplier
-        except:
-            return 0.0
+        return revenue_mean(val)
 
     def parse_revenue_for_sort(self, val_str):
         """
@@ -194,73 +767,106 @@ class SkinSystem:
         支持: "100~200" (取平均), ">100" (取100.0001), "<100" (取99.9999)
         """
         if not val_str: return -1.0
-        s = str(val_str).strip()
-
-        # 1. 范围型: A~B
-        if '~' in s:
-            parts = s.split('~')
-            if len(parts) == 2:
-                v1 = self.parse_revenue_str(parts[0])
-                v2 = self.parse_revenue_str(parts[1])
-                return (v1 + v2) / 2.0
-
-        # 2. 大于型: >A
-        if s.startswith('>') or s.startswith('》'):
-            base = self.parse_revenue_str(s)
-            return base + 0.0001  # 确保排在同数值前面
-
-        # 3. 小于型: <A
-        if s.startswith('<') or s.startswith('《'):
-            base = self.parse_revenue_str(s)
-            return base - 0.0001  # 确保排在同数值后面
-
-        # 4. 普通数值
-        return self.parse_revenue_str(s)
-
-    def _migrate_data_structure(self):
-        for skin in self.all_skins:
-            skin['list_price'] = self._get_list_price_by_quality(skin['quality'])
+        return parse_revenue(str(val_str)).weight
 
-            if 'sales_volume' not in skin: skin['sales_volume'] = "0"
-            if 'revenue' not in skin: skin['revenue'] = "0"
-            if 'real_price' not in skin: skin['real_price'] = str(skin.get('price', 0))
-            if 'is_hidden' not in skin: skin['is_hidden'] = False
-            if 'is_pool' not in skin: skin['is_pool'] = False  # 新增祈愿池标记
+    def load_data(self):
+        """
+        读取数据：版本过旧时按顺序迁移 (迁移后整体写回一次)，当前版本则直接解码
+        返回是否做过迁移；读取 / 迁移抛错时内存数据为空，并在重新加载成功前跳过所有写盘
+        """
+        self._load_error = None
+        try:
+            self._disk_sig = self.store.signature()
+            loaded = self.store.load()
+            if loaded is None:
+                self.save_data()
+                return False
+            data, migrated = hok_schema.migrate(loaded)
+            problems = [] if migrated or DATA_VALIDATION == "off" else \
+                hok_schema.validate(data, full=DATA_VALIDATION == "full")
+            if problems:
+                print(f"数据校验未通过，重新迁移: {problems[:3]}")
+                data, migrated = hok_schema.migrate(data, from_version=0)
+            if 'instructions' in data: self.instructions = data['instructions']
+            if 'quality_config' in data: self.quality_config = data['quality_config']
+            self.all_skins = self._reindex(Skin.from_dict(s) for s in data.get('skins', []))
+            self.store.adopt(self.all_skins, self._sections(), migrated=migrated)
+            if migrated: self._touch()
+            return migrated
+        except Exception as e:
+            print(f"读取数据失败，修复数据文件前不会写盘: {e!r}")
+            self._load_error = e
+            self.all_skins = self._reindex([])
+            return False
 
-            skin['sales_volume'] = str(skin['sales_volume'])
-            skin['revenue'] = str(skin['revenue'])
-            skin['real_price'] = str(skin['real_price'])
+    @_writer
+    def fetch_missing_avatars(self):
+        """为还没有本地头像的皮肤批量爬取图片"""
+        skins = [s for s in self.all_skins
+                 if not (s.get('local_img') and scanner.exists(os.path.join(LOCAL_REPO_PATH, s['local_img'])))]
+        before = {id(s): s.get('local_img') for s in skins}
+        report = self.crawler.fetch_many(skins)
+        self.save_data(skins=[s for s in skins if s.get('local_img') != before[id(s)]])
+        return report
 
-            if isinstance(skin.get('real_price'), (int, float)):
-                skin['real_price'] = str(skin['real_price'])
+    @_writer
+    def recompute_revenue(self, names=None):
+        """
+        对全部 (或指定名称的) 皮肤执行强制格式化 / 销售额重算 (hok_columns.recompute)，只保存真正变了的皮肤
+        返回 (重算销售额的条数, 变动明细 DataFrame[name, field, old, new])
+        """
+        import hok_columns
+        skins = self.all_skins if names is None else [self._by_name[n] for n in names if n in self._by_name]
+        recalc, diff = hok_columns.recompute(skins)
+        changed = set(diff['name'])
+        self.save_data(skins=[s for s in skins if s['name'] in changed])
+        return recalc, diff
 
-            if 'score' in skin: del skin['score']
-            if 'real_score' in skin: del skin['real_score']
+    def import_records(self, records, create=False):
+        """
+        批量导入更新: 按 name 匹配已有皮肤，只覆盖记录里给出的字段
+        create=True 时不存在的皮肤会新增；返回 (更新数, 新增数, 未匹配的名称列表)
+        记录给出新的 revenue (且没给 anchor) 时取消该皮肤原有的锚定
+        """
+        updated, added, missing = 0, 0, []
+        with self.batch():
+            for rec in records:
+                name = rec.get('name')
+                if not name: continue
+                skin = self.get_skin(name)
+                if skin is None:
+                    if create:
+                        self.add_skin(rec)
+                        added += 1
+                    else:
+                        missing.append(name)
+                    continue
+                changes = {k: v for k, v in rec.items() if k != 'name' and skin.get(k) != v}
+                if not changes: continue
+                if 'revenue' in changes and 'anchor' not in rec:
+                    # 明确导入的销售额优先于锚定 (与 set_revenue 一致)，先从依赖图摘掉再传播
+                    skin.pop('anchor', None)
+                    self._unlink_anchor(name)
+                skin.update(changes)
+                hok_schema.normalize_skin(skin)
+                self.save_data(skins=[skin])
+                updated += 1
+        return updated, added, missing
 
-            if 'on_leaderboard' not in skin:
-                skin['on_leaderboard'] = True
-        self.save_data()
+    @_writer
+    def compact_storage(self):
+        """把变动日志折叠回 data.json (json 模式下等同于完整重写一次，sqlite 模式下为导出 data.json)"""
+        try:
+            self.all_skins[:] = self._ranked_skins()
+            self.store.compact(self.all_skins, self._sections())
+            self._disk_sig = self.store.signature()
+            return True, "🗜️ 已导出 data.json" if STORAGE_MODE == "sqlite" else "🗜️ 已压缩为 data.json 快照"
+        except Exception as e:
+            return False, f"压缩失败: {e}"
 
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
-                if isinstance(loaded, list):
-                    self.all_skins = loaded
-                elif isinstance(loaded, dict):
-                    self.all_skins = loaded.get('skins', loaded.get('total', []))
-                    if 'instructions' in loaded: self.instructions = loaded['instructions']
-                    if 'quality_config' in loaded: self.quality_config = loaded['quality_config']
-                seen = set();
-                unique = []
-                for s in self.all_skins:
-                    if s['name'] not in seen: unique.append(s); seen.add(s['name'])
-                self.all_skins = unique
-            except:
-                self.all_skins = []
-        else:
-            self.save_data()
+    def skin_history(self, name):
+        """日志模式下某个皮肤的历史记录 [(时间, 数据), ...]"""
+        return self.store.history(name)
 
     def _get_sort_key(self, skin):
         # 1. 隐藏的放最后
@@ -269,76 +875,510 @@ class SkinSystem:
         rev_val = self.parse_revenue_for_sort(skin.get('revenue', "0"))
         return (is_hidden, -rev_val)
 
-    def save_data(self):
+    @contextmanager
+    def batch(self):
+        """批量修改：持有实例锁，期间的 save_data 只做脏标记，退出时合并为一次写盘"""
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0: self.flush()
+
+    def _touch(self, skins=None, sections=None):
+        self._version += 1
+        if skins:
+            # 变动的皮肤及其 (传递) 依赖者先重新推导锚定销售额，再一起调整排名
+            self._link_anchors(skins)
+            if self._dependents: skins = list(skins) + self._propagate_anchors(skins)
+        self.store.mark_dirty(skins, sections)
+        if skins is None and sections is None:
+            self.ranked.invalidate()
+        elif skins:
+            self.ranked.update(skins)
+
+    def save_data(self, skins=None, sections=None):
+        """
+        标记变动并落盘 (batch 内延迟到退出时)
+        skins / sections 指明变动的皮肤和配置段，均不传表示全部可能变动
+        """
+        with self.lock:
+            self._touch(skins, sections)
+            if not self._batch_depth: self.flush()
+
+    def flush(self):
+        if self._load_error is not None:
+            print(f"数据未能加载，跳过存档: {self._load_error!r}")
+            return False
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                # 排序保存
-                self.all_skins.sort(key=self._get_sort_key)
-                data_to_save = {
-                    "skins": self.all_skins,
-                    "instructions": self.instructions,
-                    "quality_config": self.quality_config
-                }
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            # 按排名保存
+            self.all_skins[:] = self._ranked_skins()
+            written = self.store.flush(self.all_skins, self._sections())
+            if written: self._disk_sig = self.store.signature()
+            return written
         except Exception as e:
             print(f"存档失败: {e}")
+            return False
+
+    def _sections(self):
+        """data.json 中 skins 之外的顶层字段 (按写出顺序)"""
+        return {'instructions': self.instructions, 'quality_config': self.quality_config,
+                'schema_version': self.schema_version}
+
+    def _reindex(self, skins):
+        """重建名称索引，返回按名称去重后的列表"""
+        self._by_name = {}
+        unique = []
+        for s in skins:
+            if s['name'] not in self._by_name:
+                self._by_name[s['name']] = s
+                unique.append(s)
+        self._sorted_names = sorted(self._by_name)
+        self.ranked.invalidate()
+        self._dependents, self._refs_of = {}, {}
+        self._link_anchors(unique)
+        return unique
+
+    def get_skin(self, name):
+        return self._by_name.get(name)
+
+    def skin_names(self):
+        """按名称排序的皮肤名列表 (共享对象，请勿修改)"""
+        return self._sorted_names
+
+    # ----------------- 锚定依赖图 -----------------
+    def _unlink_anchor(self, name):
+        for ref in self._refs_of.pop(name, ()):
+            deps = self._dependents.get(ref)
+            if deps is None: continue
+            deps.discard(name)
+            if not deps: del self._dependents[ref]
+
+    def _link_anchors(self, skins):
+        """按皮肤当前的 anchor 字段同步依赖图中它们的出边"""
+        for skin in skins:
+            name = skin['name']
+            refs = hok_schema.anchor_refs(skin.get('anchor')) or ()
+            if self._refs_of.get(name, ()) == refs: continue
+            self._unlink_anchor(name)
+            if refs:
+                self._refs_of[name] = refs
+                for ref in refs:
+                    self._dependents.setdefault(ref, set()).add(name)
+
+    def _anchor_closure(self, names):
+        """names 及其全部传递依赖者"""
+        seen, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name in seen: continue
+            seen.add(name)
+            stack.extend(self._dependents.get(name, ()))
+        return seen
+
+    def _anchor_order(self, names):
+        """
+        受影响子图 (names 及其传递依赖者) 的拓扑序 (Kahn)，被引用的排在引用者前面
+        返回 (顺序, 处在环上或依赖环的名称集合)
+        """
+        affected = self._anchor_closure(names)
+        indegree = dict.fromkeys(affected, 0)
+        for name in affected:
+            for dep in self._dependents.get(name, ()):
+                indegree[dep] += 1
+        queue = deque(n for n, d in indegree.items() if d == 0)
+        order = []
+        while queue:
+            name = queue.popleft()
+            order.append(name)
+            for dep in self._dependents.get(name, ()):
+                indegree[dep] -= 1
+                if indegree[dep] == 0: queue.append(dep)
+        return order, affected.difference(order)
+
+    def _revenue_by_name(self, name):
+        skin = self._by_name.get(name)
+        return skin.get('revenue', "0") if skin is not None else None
+
+    def _propagate_anchors(self, skins):
+        """按拓扑序重新推导 skins 及其依赖者的锚定销售额，返回 skins 之外被改动的皮肤"""
+        order, cyclic = self._anchor_order({s['name'] for s in skins})
+        if cyclic: print(f"锚定存在循环引用，已跳过: {sorted(cyclic)}")
+        touched = {id(s) for s in skins}
+        changed = []
+        for name in order:
+            skin = self._by_name.get(name)
+            if skin is None or not skin.get('anchor'): continue
+            rev = anchor_revenue(skin['anchor'], self._revenue_by_name)
+            if rev is None or rev == skin.get('revenue'): continue
+            skin['revenue'] = rev
+            if id(skin) not in touched: changed.append(skin)
+        return changed
+
+    def _resolve_anchors(self):
+        """整体重新推导所有锚定 (加载 / 整表替换后)，只保存真正变了的皮肤"""
+        if not self._refs_of: return
+        anchored = [self._by_name[n] for n in self._refs_of if n in self._by_name]
+        before = {id(s): s.get('revenue') for s in anchored}
+        self._propagate_anchors(anchored)
+        changed = [s for s in anchored if s.get('revenue') != before[id(s)]]
+        if changed: self.save_data(skins=changed)
+
+    def preview_anchor(self, anchor):
+        """按当前数据推导锚定的销售额文本 (不保存)；引用缺失返回 None"""
+        return anchor_revenue(anchor, self._revenue_by_name)
+
+    def check_anchor(self, name, anchor):
+        """name 能否锚定到 anchor：可以返回 None，否则返回原因 (格式不对 / 参照不存在 / 循环引用)"""
+        refs = hok_schema.anchor_refs(anchor)
+        if refs is None: return f"锚定格式不对: {anchor}"
+        missing = [r for r in refs if r not in self._by_name]
+        if missing: return f"参照皮肤不存在: {', '.join(missing)}"
+        loop = [r for r in refs if r in self._anchor_closure([name])]
+        if loop: return f"循环引用: {name} 与 {', '.join(loop)} 互相锚定"
+        return None
+
+    @_writer
+    def set_revenue(self, name, revenue=None, anchor=None, updates=None):
+        """
+        修改皮肤销售额：给出 anchor 时按引用推导 (revenue 被忽略)，否则写入 revenue 并取消原有锚定
+        updates 是一起修改的其他字段，校验通过后才写入；依赖它的锚定皮肤随之更新
+        返回 (成功, 提示)，引用不存在或会形成循环时不做任何修改
+        """
+        skin = self._by_name.get(name)
+        if skin is None: return False, f"找不到皮肤: {name}"
+        if anchor is not None:
+            problem = self.check_anchor(name, anchor)
+            if problem: return False, problem
+        if updates:
+            skin.update(updates)
+            hok_schema.normalize_skin(skin)
+        if anchor is not None:
+            skin['anchor'] = dict(anchor)
+        else:
+            skin.pop('anchor', None)
+            skin['revenue'] = revenue if revenue is not None else "0"
+        self.save_data(skins=[skin])
+        return True, f"{name}: {skin.get('revenue')}"
+
+    @_writer
+    def add_skin(self, data):
+        """新增皮肤并返回；已有同名皮肤时不做任何修改，返回 None (各存储都按名称区分皮肤)"""
+        skin = Skin.from_dict(hok_schema.normalize_skin(dict(data)))
+        if skin['name'] in self._by_name: return None
+        self.all_skins.append(skin)
+        self._by_name[skin['name']] = skin
+        bisect.insort(self._sorted_names, skin['name'])
+        self.save_data(skins=[skin])
+        return skin
+
+    @_writer
+    def delete_skin(self, name):
+        skin = self._by_name.pop(name, None)
+        if skin is None: return False
+        self.all_skins = [s for s in self.all_skins if s is not skin]
+        self.ranked.remove(skin)
+        self._unlink_anchor(name)
+        i = bisect.bisect_left(self._sorted_names, name)
+        if i < len(self._sorted_names) and self._sorted_names[i] == name: del self._sorted_names[i]
+        self.save_data(skins=[])  # 只少了一条，存储层按顺序变化判断需要重写
+        return True
+
+    @_writer
+    def replace_skins(self, records):
+        """
+        用编辑器导出的记录整体替换皮肤列表 (没有名称的空行会被丢弃，其余逐条按当前结构规范化)
+        记录不带 anchor 时沿用同名皮肤原有的锚定；销售额被手工改过的则视为取消锚定
+        """
+        for r in records:
+            old = self._by_name.get(r.get('name'))
+            if 'anchor' not in r and old is not None and old.get('anchor') and r.get('revenue') == old.get('revenue'):
+                r['anchor'] = old['anchor']
+        self.all_skins = self._reindex(Skin.from_dict(hok_schema.normalize_skin(r)) for r in records if r.get('name'))
+        self._resolve_anchors()
+        self._refresh_list_prices()
+        self.save_data()
+
+    def columns(self):
+        """列式视图 (hok_columns.SkinColumns)，数据变动后首次访问时重建"""
+        if self._columns is None or self._columns.version != self._version:
+            import hok_columns
+            self._columns = hok_columns.SkinColumns(self, self._version)
+        return self._columns
+
+    def skin_frame(self, active=False):
+        """概览 / 编辑器用的 DataFrame，同一数据版本内重复调用不重建"""
+        return self.columns().frame(active)
+
+    def _ranked_skins(self):
+        """排名索引里的皮肤列表 (共享对象，请勿修改)；索引失效时先重建"""
+        if not self.ranked.valid or len(self.ranked) != len(self.all_skins):
+            with self.lock:
+                self.ranked.rebuild(self.all_skins)
+        return self.ranked.skins
 
     def get_total_skins(self):
-        data = self.all_skins[:]
-        data.sort(key=self._get_sort_key)
-        return data
+        return list(self._ranked_skins())
+
+    @staticmethod
+    def _is_active(skin):
+        return not skin.get('is_hidden', False) and skin.get('on_leaderboard', True)
+
+    def get_active_leaderboard(self, limit=None):
+        """活跃榜 (按排名)；limit 给定时只取前 limit 个"""
+        if limit is not None: return self.top_leaderboard(limit)
+        return [s for s in self._ranked_skins() if self._is_active(s)]
+
+    def top_leaderboard(self, n=None):
+        """
+        活跃榜前 n 名 (默认 LEADERBOARD_CAPACITY)
+        索引有效时沿排名顺序取前 n 个；失效时用堆选出前 n 个，不为此重建整表排序
+        """
+        n = LEADERBOARD_CAPACITY if n is None else n
+        if self.ranked.valid and len(self.ranked) == len(self.all_skins):
+            return self.ranked.first(n, self._is_active)
+        return heapq.nsmallest(n, filter(self._is_active, self.all_skins), key=self._get_sort_key)
 
-    def get_active_leaderboard(self):
-        active = [s for s in self.all_skins if not s.get('is_hidden', False) and s.get('on_leaderboard', True)]
-        active.sort(key=self._get_sort_key)
-        return active
+    def find_skins(self, quality=None, limit=None, **flags):
+        """
+        按品质代码 / 标记筛选皮肤 (如 find_skins(is_preset=True))，按排名排列
+        sqlite 存储且没有未落盘的修改时由数据库索引完成，否则沿排名索引遍历
+        """
+        query = getattr(self.store, 'query', None)
+        if query is not None and not self.store.is_dirty:
+            return [self._by_name[n] for n in query(quality=quality, limit=limit, **flags) if n in self._by_name]
+        defaults = hok_schema.FLAG_DEFAULTS
+        found = [s for s in self._ranked_skins()
+                 if (quality is None or s.get('quality') == quality) and
+                 all(bool(s.get(f, defaults[f])) == bool(v) for f, v in flags.items())]
+        return found if limit is None else found[:limit]
 
-    def auto_prune_leaderboard(self):
-        self.all_skins.sort(key=self._get_sort_key)
+    @_writer
+    def auto_prune_leaderboard(self, demote=False):
+        """
+        按排名重排皮肤列表；demote=True 时把跌出前 LEADERBOARD_CAPACITY 名的活跃皮肤撤下活跃榜
+        返回被撤下的皮肤列表
+        """
+        self.all_skins[:] = self._ranked_skins()
+        if not demote: return []
+        demoted = self.get_active_leaderboard()[LEADERBOARD_CAPACITY:]
+        for skin in demoted:
+            skin['on_leaderboard'] = False
+        self.save_data(skins=demoted)
+        return demoted
 
     def get_header_gifs(self):
         show_dir = os.path.join(LOCAL_REPO_PATH, "show")
-        if not os.path.exists(show_dir): return []
-        gifs = [f for f in os.listdir(show_dir) if f.lower().endswith('.gif')]
-        gifs.sort()
-        return gifs
+        return [f for f in scanner.files(show_dir) if f.lower().endswith('.gif')]
+
+    def _quality_icon(self, q_key):
+        """构建时确定品质图标：自身 gif -> 自身 jpg -> 沿父级链依次同样查找；都没有返回 None"""
+        icons = scanner.by_stem(os.path.join(LOCAL_REPO_PATH, "images"), hok_assets.ICON_EXTS)
+        seen = set()
+        while q_key and q_key not in seen:
+            seen.add(q_key)
+            if q_key in icons:
+                return self.assets.url(f"images/{icons[q_key]}", 'icon', INLINE_ICON_MAX_BYTES)
+            entry = self.quality_index.entries.get(q_key)
+            q_key = entry.parent if entry else None
+        return None
+
+    def _quality_view(self, q_key):
+        icon = self._quality_icon(q_key)
+        entry = self.quality_index.entries.get(q_key)
+        if entry is None: return QualityView(q_key, '', 1.0, '#ffffff', '', icon, None)
+        cls = 'rare-wushuang-big' if entry.root_name == '珍品无双' else ('wushuang-big' if entry.root_name == '无双' else '')
+        return QualityView(q_key, entry.name or '', entry.scale, entry.bg_color, cls, icon, entry.root)
 
-    def generate_html(self):
+    def _build_rows(self, skins):
+        """把皮肤转成模板行视图 (隐藏皮肤不输出)，品质视图按品质代码共用"""
+        q_views = {}
+        rows = []
+        for skin in skins:
+            if skin.get('is_hidden'): continue
+            q_key = skin.get('quality_key')
+            q = q_views.get(q_key)
+            if q is None: q = q_views[q_key] = self._quality_view(q_key)
+            badge = next(((cls, text) for field, cls, text in _BADGES if skin.get(field)), None)
+            growth = skin.get('growth')
+            avatar = self.assets.url(skin['local_img'], 'avatar') if skin.get('local_img') else './placeholder.jpg'
+            desc = self.assets.url(f"skin_descs/{skin['desc_img']}", 'desc') if skin.get('desc_img') else None
+            rows.append(RowView(skin['name'], skin.get('quality'), q,
+                                not skin.get('is_preset') and not skin.get('is_discontinued'),
+                                avatar, badge, desc, skin.get('sales_volume'),
+                                skin.get('revenue'), growth, _growth_class(growth) if growth else '',
+                                _int_or_zero(skin.get('list_price')), skin.get('real_price'),
+                                _float_or_zero(skin.get('quality')), self.parse_revenue_for_sort(skin.get('sales_volume')),
+                                self.parse_revenue_for_sort(skin.get('revenue')), _float_or_zero(growth),
+                                self.parse_revenue_for_sort(skin.get('real_price')), skin.get('on_leaderboard', True)))
+        return rows
+
+    def _page_views(self, rows):
+        """
+        一次遍历已排好序的行，切分出各个页面: [(文件名, 标题, 行列表), ...]
+        全部 / 在榜 / 前 LEADERBOARD_CAPACITY / 每个根品质一页；各页共用同一批行视图，不重新排序
+        """
+        active, by_root = [], {}
+        for row in rows:
+            if row.active: active.append(row)
+            if row.q.root: by_root.setdefault(row.q.root, []).append(row)
+        pages = [("index.html", "全部", rows), ("active.html", "在榜", active),
+                 ("top.html", f"Top {LEADERBOARD_CAPACITY}", active[:LEADERBOARD_CAPACITY])]
+        roots = sorted(by_root, key=lambda k: -self.quality_index.entries[k].price)
+        pages += [(f"quality-{k}.html", self.quality_index.entries[k].name or k, by_root[k]) for k in roots]
+        return pages
+
+    @staticmethod
+    def _row_fragments(rows):
+        """所有行一次渲染成片段: id(row) -> (行开头, 是否参与排名, 其余单元格)"""
+        sep = '\x00'
+        parts = TEMPLATE_ENV.get_template('row.html').render(rows=rows, sep=sep).split(sep)
+        return {id(row): (parts[2 * i], row.ranked, parts[2 * i + 1]) for i, row in enumerate(rows)}
+
+    @staticmethod
+    def _rows_payload(rows):
+        """
+        虚拟滚动模式的行数据 (紧凑 JSON)：品质视图与角标各存一份，行里只放下标
+        行数组: [名称, 品质下标, 排名(-1 不参与), 头像, 角标下标(-1 无), 描述图, 销量, 销售额, 增长, 增长样式,
+                 万象积分, 售价, 品质值, 销量值, 销售额值, 增长值, 售价值]
+        """
+        q_index, qualities, b_index, badges, out = {}, [], {}, [], []
+        for i, row in enumerate(rows, 1):
+            q = row.q
+            if id(q) not in q_index:
+                q_index[id(q)] = len(qualities)
+                qualities.append([q.key, q.name, q.scale, q.bg_color, q.cls, q.icon])
+            if row.badge and row.badge not in b_index:
+                b_index[row.badge] = len(badges)
+                badges.append(list(row.badge))
+            out.append([row.name, q_index[id(q)], i if row.ranked else -1, row.avatar,
+                        b_index[row.badge] if row.badge else -1, row.desc or '', row.sales_volume, row.revenue,
+                        str(row.growth) if row.growth else None, row.growth_cls, row.list_price, row.real_price,
+                        row.quality_v, row.sales_v, row.revenue_v, row.growth_v, row.real_v])
+        payload = {'qualities': qualities, 'badges': badges, 'rows': out}
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def _load_build_stamp(self):
+        try:
+            with open(self.build_stamp_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_build_stamp(self, **fields):
+        stamp = self._load_build_stamp()
+        stamp.update(fields)
+        hok_storage.atomic_write(self.build_stamp_path, json.dumps(stamp, ensure_ascii=False, indent=2))
+
+    def _content_hash(self, skins, header_gifs):
+        """渲染输入的指纹：皮肤、品质配置、说明、模板、以及页面引用的资源目录清单"""
+        h = hashlib.sha1(f"{TEMPLATE_DIGEST}:{self.assets.signature}:{INLINE_ICON_MAX_BYTES}:{RENDER_MODE}:"
+                         f"{LEADERBOARD_CAPACITY}".encode("utf-8"))
+        for part in (skins, self.quality_config, self.instructions, header_gifs):
+            h.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=dict).encode('utf-8'))
+        for d in (self.avatar_dir, self.desc_dir, os.path.join(LOCAL_REPO_PATH, "show"),
+                  os.path.join(LOCAL_REPO_PATH, "images")):
+            h.update(repr(scanner.manifest(d)).encode('utf-8'))
+        return h.hexdigest()
+
+    @_writer
+    def build_html(self, force=False):
+        """
+        生成 index.html，返回 (成功, 是否有变化, 提示)
+        渲染输入的指纹与上次生成一致且 index.html 还在时直接跳过，update_time 也保持不变
+        """
         self.scan_local_images()
-        self.save_data()
         header_gifs = self.get_header_gifs()
-        desc_files = {}
-        if os.path.exists(self.desc_dir):
-            for f in os.listdir(self.desc_dir): desc_files[os.path.splitext(f)[0]] = f
+        desc_files = scanner.by_stem(self.desc_dir)
 
         display_skins = self.get_total_skins()
 
+        changed = []
         for skin in display_skins:
-            skin['desc_img'] = desc_files.get(skin['name'])
-            raw_q = skin['quality']
-            q_key = str(raw_q)
-            if q_key in self.quality_config:
-                pass
-            elif q_key.endswith('.0') and q_key[:-2] in self.quality_config:
-                q_key = q_key[:-2]
-            else:
-                try:
-                    f_val = float(raw_q)
-                    for k in self.quality_config:
-                        if math.isclose(float(k), f_val, rel_tol=1e-9):
-                            q_key = k;
-                            break
-                except:
-                    pass
-            skin['quality_key'] = q_key
+            desc_img = desc_files.get(skin['name'])
+            q_key = self.quality_index.key_for(skin['quality']) or str(skin['quality'])
+            if skin.get('desc_img') != desc_img or skin.get('quality_key') != q_key:
+                skin['desc_img'] = desc_img
+                skin['quality_key'] = q_key
+                changed.append(skin)
+        self.save_data(skins=changed)
+
+        html_path = os.path.join(LOCAL_REPO_PATH, "index.html")
+        digest = self._content_hash(display_skins, header_gifs)
+        if not force and digest == self._load_build_stamp().get('built') and os.path.exists(html_path):
+            return True, False, "📄 内容无变化，跳过生成"
 
-        t = Template(hok_templates.HTML_TEMPLATE)
-        html_content = t.render(total_skins=display_skins, quality_config=self.quality_config,
-                                header_gifs=header_gifs, instructions=self.instructions,
-                                update_time=datetime.now().strftime("%Y-%m-%d %H:%M"))
+        update_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        virtual = RENDER_MODE == "virtual"
+        t = TEMPLATE_ENV.get_template('virtual.html' if virtual else 'index.html')
         try:
-            with open(os.path.join(LOCAL_REPO_PATH, "index.html"), "w", encoding='utf-8') as f:
-                f.write(html_content)
-            return True, "📄 HTML 生成成功"
+            rows = self._build_rows(display_skins)
+            header_urls = [self.assets.url(f"show/{g}", 'header') for g in header_gifs[:4]]
+            pages = self._page_views(rows)
+            base = dict(quality_config=self.quality_config, header_gifs=header_urls, instructions=self.instructions,
+                        update_time=update_time, pages=[(f, title) for f, title, _ in pages])
+            fragments = None if virtual else self._row_fragments(rows)
+            outputs = {}
+            for file_name, _, page_rows in pages:
+                context = dict(base, current_page=file_name)
+                if virtual:
+                    context['data_url'] = self.assets.write_blob(f"rows-{os.path.splitext(file_name)[0]}", '.json',
+                                                                 self._rows_payload(page_rows))
+                else:
+                    context['rows'] = [fragments[id(row)] for row in page_rows]
+                outputs[file_name] = t.render(**context)
+            self.assets.finish()
+            for file_name, html_content in outputs.items():
+                hok_storage.atomic_write(os.path.join(LOCAL_REPO_PATH, file_name), html_content)
+            # 上次生成过、这次没有的页面 (如删掉的品质) 一并删除
+            for file_name in self._load_build_stamp().get('pages', []):
+                if file_name not in outputs and os.path.exists(os.path.join(LOCAL_REPO_PATH, file_name)):
+                    os.remove(os.path.join(LOCAL_REPO_PATH, file_name))
+            self._save_build_stamp(built=digest, update_time=update_time, pages=list(outputs))
+            return True, True, f"📄 HTML 生成成功 ({len(outputs)} 个页面)"
         except Exception as e:
-            return False, f"HTML 生成失败: {e}"
\ No newline at end of file
+            self.assets.discard()
+            return False, False, f"HTML 生成失败: {e}"
+
+    def generate_html(self, force=False):
+        ok, _, msg = self.build_html(force)
+        return ok, msg
+
+    def _git(self, *args):
+        with hok_profile.span(f"git {args[0]}"):
+            return subprocess.run([GIT_EXECUTABLE_PATH, *args], cwd=LOCAL_REPO_PATH, capture_output=True,
+                                  text=True)
+
+    def publish(self, force=False):
+        """
+        生成网页并 git add / commit / push，返回 (成功, 提示)
+        内容指纹与上次成功推送的一致时整个 git 流程都跳过；commit 失败会直接报错而不是继续 push
+        """
+        with self.lock:  # 生成与 git 之间不允许其他会话改数据
+            ok, _, msg = self.build_html(force)
+            if not ok: return False, msg
+            stamp = self._load_build_stamp()
+            if not force and stamp.get('built') and stamp.get('built') == stamp.get('pushed'):
+                return True, "✅ 内容无变化，无需推送"
+            try:
+                result = self._git("add", ".")
+                if result.returncode != 0: return False, f"git add 失败: {result.stderr.strip()}"
+                # 暂存区为空时 commit 会返回非零，此时跳过 commit 直接 push (可能有之前未推送的提交)
+                if self._git("diff", "--cached", "--quiet").returncode != 0:
+                    result = self._git("commit", "-m", "sync via dashboard")
+                    if result.returncode != 0:
+                        return False, f"提交失败: {(result.stderr or result.stdout).strip()}"
+                result = self._git("push")
+                if result.returncode != 0: return False, f"推送失败: {result.stderr.strip()}"
+            except OSError as e:
+                return False, f"Git 执行失败: {e}"
+            self._save_build_stamp(pushed=stamp.get('built'))
+            return True, "✅ 发布成功！"
+
+
+# 粗粒度操作及生成网页的主要阶段计时 (未开启收集时只多一次属性读取)；逐行调用的访问方法不计时
+hok_profile.instrument(SkinSystem, (
+    '__init__', 'reload_if_stale', 'load_data', 'save_data', 'flush', 'compact_storage', 'skin_frame',
+    'replace_skins', 'import_records', 'recompute_revenue', 'fetch_missing_avatars',
+    'build_html', 'generate_html', 'publish', '_build_rows', '_row_fragments', '_content_hash'))
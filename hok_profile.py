@@ -0,0 +1,162 @@
+# ================= 性能剖析 =================
+# 按阶段计时 (可选 tracemalloc 内存峰值)：
+#   hok_profile.start()                 # 当前线程开始收集 (Streamlit 每次 rerun 一个收集器)
+#   with hok_profile.span("阶段名"): ...
+#   report = hok_profile.stop().report()
+# 没有调用 start() 的线程里 span() 返回共享的空上下文，instrument() 包装的方法只多一次属性读取；
+# 只给粗粒度的操作 (加载 / 保存 / 生成网页 / 发布 ...) 计时，逐行调用的小方法不要包装
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+
+class _Local(threading.local):
+    collector = None  # 类属性作缺省值：没开始收集的线程读取时不会走 AttributeError 分支
+
+
+_local = _Local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('collector', 'name', 't0', 'mem0', 'child_peak')
+
+    def __init__(self, collector, name):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self):
+        c = self.collector
+        self.child_peak = 0
+        if c.trace_memory:
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        c.stack.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        c = self.collector
+        c.stack.pop()
+        peak = net = 0
+        if c.trace_memory:
+            # tracemalloc 只有一个全局峰值：子阶段退出时把它见到的峰值交给父阶段，父阶段取两者较大者
+            cur, abs_peak = tracemalloc.get_traced_memory()
+            abs_peak = max(abs_peak, self.child_peak)
+            if c.stack: c.stack[-1].child_peak = max(c.stack[-1].child_peak, abs_peak)
+            peak, net = abs_peak - self.mem0, cur - self.mem0
+        c.add(self.name, elapsed, peak, net)
+        return False
+
+
+class Collector:
+    """一次 rerun (或一次命令) 内的统计：阶段名 -> [次数, 总耗时, 最大耗时, 内存峰值增量, 净增内存]"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stats = {}
+        self.stack = []
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.wall = None
+        self._owns_tracing = False
+
+    def add(self, name, elapsed, peak=0, net=0):
+        s = self.stats.get(name)
+        if s is None:
+            self.stats[name] = [1, elapsed, elapsed, peak, net]
+            return
+        s[0] += 1
+        s[1] += elapsed
+        if elapsed > s[2]: s[2] = elapsed
+        if peak > s[3]: s[3] = peak
+        s[4] += net
+
+    def report(self):
+        """按总耗时降序的行列表 (毫秒 / KiB)"""
+        rows = []
+        for name, (count, total, longest, peak, net) in self.stats.items():
+            row = {'span': name, 'calls': count, 'total_ms': round(total * 1e3, 3),
+                   'mean_ms': round(total * 1e3 / count, 3), 'max_ms': round(longest * 1e3, 3)}
+            if self.trace_memory:
+                row['peak_kib'] = round(peak / 1024, 1)
+                row['net_kib'] = round(net / 1024, 1)
+            rows.append(row)
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows
+
+    def to_dict(self):
+        return {'started': self.started, 'wall_ms': round((self.wall or 0) * 1e3, 3),
+                'trace_memory': self.trace_memory, 'spans': self.report()}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+def start(trace_memory=False):
+    """在当前线程开始一个新的收集器 (替换上一次未 stop 的)"""
+    c = Collector(trace_memory)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        c._owns_tracing = True
+    _local.collector = c
+    return c
+
+
+def stop():
+    """结束当前线程的收集并返回收集器；没有在收集时返回 None"""
+    c = _local.collector
+    if c is None: return None
+    _local.collector = None
+    c.wall = time.perf_counter() - c.t0
+    if c._owns_tracing: tracemalloc.stop()
+    return c
+
+
+def current():
+    return _local.collector
+
+
+def span(name):
+    c = _local.collector
+    if c is None: return _NULL_SPAN
+    return _Span(c, name)
+
+
+def _timed(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        c = _local.collector
+        if c is None: return func(*args, **kwargs)
+        with _Span(c, name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument(cls, names):
+    """给类中列出的方法套上计时 (支持 staticmethod / classmethod)，阶段名为 '类名.方法名'；返回类本身"""
+    for attr in names:
+        value = vars(cls)[attr]
+        name = f"{cls.__name__}.{attr}"
+        if isinstance(value, (staticmethod, classmethod)):
+            setattr(cls, attr, type(value)(_timed(value.__func__, name)))
+        else:
+            setattr(cls, attr, _timed(value, name))
+    return cls
@@ -0,0 +1,136 @@
+# ================= 数据结构版本 =================
+# data.json 顶层带 schema_version；旧版本数据按顺序执行迁移 (每步只执行一次)，
+# 迁移完成并写回后，之后的加载就是直接解码，不再逐条修补
+
+# 标记字段及缺省值 (顺序即 hok_logic.FLAG_FIELDS)
+FLAG_DEFAULTS = {'is_new': False, 'is_rerun': False, 'is_preset': False, 'is_discontinued': False,
+                 'is_pool': False, 'is_hidden': False, 'on_leaderboard': True}
+TEXT_FIELDS = ('sales_volume', 'revenue', 'real_price')
+FLOAT_FIELDS = ('growth', 'list_price')
+OPTIONAL_TEXT_FIELDS = ('local_img', 'desc_img', 'quality_key')
+# 锚定: {'op': 比较符, 'ref': 皮肤名} 或 {'lo': 下限皮肤名, 'hi': 上限皮肤名}，销售额由引用的皮肤推导
+ANCHOR_OPS = ('>', '<', '≈')
+
+
+def anchor_refs(anchor):
+    """锚定引用的皮肤名元组；格式不对返回 None"""
+    if not isinstance(anchor, dict): return None
+    ref = anchor.get('ref')
+    if anchor.get('op') in ANCHOR_OPS and isinstance(ref, str) and ref: return (ref,)
+    lo, hi = anchor.get('lo'), anchor.get('hi')
+    if isinstance(lo, str) and lo and isinstance(hi, str) and hi: return (lo, hi)
+    return None
+
+
+def _to_float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ----------------- 单条皮肤的迁移步骤 -----------------
+def _v1_fill_fields(skin):
+    """v0 -> v1: 补齐销量 / 销售额 / 售价 / 隐藏 / 祈愿 / 上榜字段，去掉旧的评分字段，数值统一为字符串"""
+    if 'sales_volume' not in skin: skin['sales_volume'] = "0"
+    if 'revenue' not in skin: skin['revenue'] = "0"
+    if 'real_price' not in skin: skin['real_price'] = str(skin.get('price', 0))
+    if 'is_hidden' not in skin: skin['is_hidden'] = False
+    if 'is_pool' not in skin: skin['is_pool'] = False
+    if 'on_leaderboard' not in skin: skin['on_leaderboard'] = True
+    for field in TEXT_FIELDS:
+        skin[field] = str(skin[field])
+    skin.pop('score', None)
+    skin.pop('real_score', None)
+
+
+def _v2_typed_fields(skin):
+    """v1 -> v2: 字段类型固定下来 (标记为 bool 且全部存在、增长 / 积分为 float、品质代码为数值)"""
+    for field, default in FLAG_DEFAULTS.items():
+        skin[field] = bool(skin.get(field, default))
+    for field in FLOAT_FIELDS:
+        skin[field] = _to_float(skin.get(field))
+    q = skin.get('quality')
+    if isinstance(q, str):
+        # 解析不了的品质代码保留原文 (按未知品质显示)，一条坏数据不能让整个迁移失败
+        try:
+            skin['quality'] = float(q) if '.' in q else int(q)
+        except ValueError:
+            pass
+    for field in TEXT_FIELDS:
+        if skin.get(field) is None: skin[field] = "0"
+    for field in OPTIONAL_TEXT_FIELDS:
+        if skin.get(field) is not None and not isinstance(skin[field], str): skin[field] = str(skin[field])
+
+
+def _v3_anchor_field(skin):
+    """v2 -> v3: 新增可选的 anchor 字段；空的或格式不对的锚定去掉 (销售额保留原文本)"""
+    if 'anchor' in skin and anchor_refs(skin['anchor']) is None: del skin['anchor']
+
+
+# 第 i 项把版本 i 迁移到 i + 1
+SKIN_MIGRATIONS = [_v1_fill_fields, _v2_typed_fields, _v3_anchor_field]
+SCHEMA_VERSION = len(SKIN_MIGRATIONS)
+
+
+def _shape(data):
+    """旧格式顶层可能是皮肤列表，或用 'total' 存皮肤"""
+    if isinstance(data, list): return {'skins': data}
+    if 'skins' not in data: data['skins'] = data.pop('total', [])
+    data.pop('total', None)
+    return data
+
+
+def version_of(data):
+    return data.get('schema_version', 0) if isinstance(data, dict) else 0
+
+
+def migrate(data, from_version=None):
+    """
+    把加载到的原始数据迁移到当前版本，返回 (数据, 是否做过迁移)
+    from_version 指定时从该版本重新迁移 (各步骤都是幂等的)
+    """
+    version = version_of(data) if from_version is None else from_version
+    if version >= SCHEMA_VERSION: return data, False
+    data = _shape(data)
+    steps = SKIN_MIGRATIONS[version:]
+    for skin in data['skins']:
+        for step in steps:
+            step(skin)
+    data['schema_version'] = SCHEMA_VERSION
+    return data, True
+
+
+def normalize_skin(record):
+    """编辑器 / 导入产生的单条记录按当前版本规范化 (原地修改并返回)"""
+    for step in SKIN_MIGRATIONS:
+        step(record)
+    return record
+
+
+def validate(data, full=False):
+    """
+    校验已是当前版本的数据，返回问题列表 (空列表表示通过)
+    快速模式只看顶层结构和首尾两条皮肤；full=True 逐条检查字段类型
+    """
+    if not isinstance(data, dict): return ["顶层不是对象"]
+    problems = []
+    if data.get('schema_version') != SCHEMA_VERSION: problems.append(f"schema_version 不是 {SCHEMA_VERSION}")
+    skins = data.get('skins')
+    if not isinstance(skins, list): return problems + ["skins 不是列表"]
+    if not isinstance(data.get('quality_config', {}), dict): problems.append("quality_config 不是对象")
+    if not isinstance(data.get('instructions', []), list): problems.append("instructions 不是列表")
+    for i, skin in (enumerate(skins) if full else ((0, skins[0]), (len(skins) - 1, skins[-1])) if skins else ()):
+        problems.extend(f"skins[{i}]: {p}" for p in _skin_problems(skin))
+    return problems
+
+
+def _skin_problems(skin):
+    if not isinstance(skin, dict): return ["不是对象"]
+    problems = []
+    if not isinstance(skin.get('name'), str) or not skin['name']: problems.append("缺少 name")
+    problems += [f"{f} 不是 bool" for f in FLAG_DEFAULTS if not isinstance(skin.get(f), bool)]
+    problems += [f"{f} 不是字符串" for f in TEXT_FIELDS if not isinstance(skin.get(f), str)]
+    problems += [f"{f} 不是数值" for f in FLOAT_FIELDS if not isinstance(skin.get(f), float)]
+    if 'anchor' in skin and anchor_refs(skin['anchor']) is None: problems.append("anchor 格式不对")
+    return problems
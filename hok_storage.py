@@ -0,0 +1,421 @@
+# ================= 存储层 =================
+# 负责 data.json 的读写：脏标记、按皮肤缓存序列化片段、原子写入
+
+import hashlib
+import json
+import operator
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+import hok_schema
+
+
+def _dump(value, indent):
+    """与 json.dump(indent=2) 输出一致的片段，整体右移 indent 个空格以便直接拼接 (Skin 等映射按 dict 输出)"""
+    return json.dumps(value, ensure_ascii=False, indent=2, default=dict).replace('\n', '\n' + ' ' * indent)
+
+
+def atomic_write(path, text):
+    """先写同目录临时文件再 rename，崩溃时不会留下写了一半的文件"""
+    dir_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=dir_name)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStore:
+    """
+    data.json 存储
+    - 每个皮肤的序列化结果按对象缓存，只有被标脏 / 新增的皮肤才重新序列化
+    - 皮肤顺序、脏标记都没变时直接跳过；拼出的内容与磁盘一致时也不写盘
+    - 除 skins 外的顶层字段 (instructions / quality_config / schema_version ...) 以有序字典 sections 传入
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fragments = {}  # id(skin) -> (skin, 片段)；持有 skin 引用，保证 id 不被复用
+        self._sections = {}
+        self._order = None  # 上次落盘时的皮肤对象列表 (按身份比较顺序)
+        self._dirty_skins = set()
+        self._dirty_sections = set()
+        self._all_dirty = True
+        self._digest = None
+
+    @property
+    def is_dirty(self):
+        return self._all_dirty or bool(self._dirty_skins) or bool(self._dirty_sections)
+
+    def _same_order(self, skins):
+        prev = self._order
+        return prev is not None and len(prev) == len(skins) and all(map(operator.is_, prev, skins))
+
+    def signature(self):
+        """磁盘上数据文件的 (mtime_ns, 大小)，用来发现其他进程的写入"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        if not os.path.exists(self.path): return None
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        self._digest = hashlib.sha1(raw).hexdigest()
+        return json.loads(raw.decode('utf-8'))
+
+    def adopt(self, skins, sections=None, migrated=False):
+        """
+        刚从磁盘加载的数据视为干净，序列化片段在首次需要时再生成
+        migrated=True 表示加载后做过结构迁移，内存与磁盘不一致，下次 flush 整体写回
+        """
+        self._order = list(skins)
+        self._fragments = {}
+        self._sections = {}
+        self._dirty_skins.clear()
+        self._dirty_sections.clear()
+        self._all_dirty = migrated
+
+    def mark_dirty(self, skins=None, sections=None):
+        """不传参数表示全部数据都可能变动"""
+        if skins is None and sections is None:
+            self._all_dirty = True
+            return
+        for s in skins or ():
+            self._dirty_skins.add(id(s))
+        self._dirty_sections.update(sections or ())
+
+    def _skin_fragment(self, skin):
+        key = id(skin)
+        cached = self._fragments.get(key)
+        if cached is None or self._all_dirty or key in self._dirty_skins:
+            cached = (skin, _dump(skin, 4))
+        return cached
+
+    def flush(self, skins, sections):
+        """落盘，返回是否真的写了文件"""
+        if not self.is_dirty and self._same_order(skins):
+            return False
+
+        fragments = {id(s): self._skin_fragment(s) for s in skins}
+        for name, value in sections.items():
+            if self._all_dirty or name in self._dirty_sections or name not in self._sections:
+                self._sections[name] = _dump(value, 2)
+        self._fragments = fragments
+        self._order = list(skins)
+        self._dirty_skins.clear()
+        self._dirty_sections.clear()
+        self._all_dirty = False
+
+        skins_text = '[\n    ' + ',\n    '.join(fragments[id(s)][1] for s in skins) + '\n  ]' if skins else '[]'
+        text = ('{\n  "skins": ' + skins_text +
+                ''.join(',\n  ' + json.dumps(name) + ': ' + self._sections[name] for name in sections) + '\n}')
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        if digest == self._digest:
+            return False
+        try:
+            atomic_write(self.path, text)
+        except BaseException:
+            self._order = None  # 写盘失败，下次 flush 重新尝试
+            raise
+        self._digest = digest
+        return True
+
+    def compact(self, skins, sections):
+        """强制完整重写一次 data.json"""
+        self.mark_dirty()
+        self._digest = None
+        return JsonStore.flush(self, skins, sections)
+
+    def history(self, name):
+        return []  # 整体重写模式不保留历史
+
+
+def _compact(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=dict)
+
+
+class JournalStore(JsonStore):
+    """
+    日志模式：data.json 作为快照，每次修改只向 data.journal.jsonl 追加变动记录
+    - 加载时 = 快照 + 依次重放日志
+    - compact() 把日志折叠回快照并清空日志
+    记录格式: {"ts", "op": "skin"/"drop"/"section", "name"/"key", "data"}
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.journal_path = os.path.splitext(path)[0] + '.journal.jsonl'
+        self._known = {}  # name -> (skin 对象, 最近一次记录的紧凑序列化)，用于判断是否真的变了
+        self._known_sections = {}
+        self._compact_pending = False
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path): return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line: continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时可能残留半行，跳过
+
+    def load(self):
+        data = super().load()
+        has_journal = os.path.exists(self.journal_path)
+        if data is None and not has_journal: return None
+        if data is None: data = {}
+        if isinstance(data, list): data = {'skins': data}
+        skins = {}
+        for s in data.get('skins', data.get('total', [])):
+            skins.setdefault(s['name'], s)
+        for rec in self._read_journal():
+            op = rec.get('op')
+            if op == 'skin':
+                skins[rec['name']] = rec['data']
+            elif op == 'drop':
+                skins.pop(rec['name'], None)
+            elif op == 'section':
+                data[rec['key']] = rec['data']
+        data.pop('total', None)
+        data['skins'] = list(skins.values())
+        return data
+
+    def signature(self):
+        try:
+            st = os.stat(self.journal_path)
+            journal = st.st_mtime_ns, st.st_size
+        except OSError:
+            journal = None
+        return super().signature(), journal
+
+    def adopt(self, skins, sections=None, migrated=False):
+        super().adopt(skins, migrated=migrated)
+        self._known = {s['name']: (s, _compact(s)) for s in skins}
+        self._known_sections = {k: _compact(v) for k, v in (sections or {}).items()}
+        # 迁移后的数据与快照 + 日志都对不上 (_known 已是迁移后的样子，逐条比较发现不了差异)，下次落盘直接压缩成新快照
+        self._compact_pending = migrated
+
+    def _append(self, records):
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lines = ''.join(_compact(dict(ts=ts, **rec)) + '\n' for rec in records)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self, skins, sections):
+        if self._compact_pending or not os.path.exists(self.path):
+            return self.compact(skins, sections)
+        if not self.is_dirty and self._same_order(skins):
+            return False
+
+        records = []
+        current = {}
+        for s in skins:
+            name = s['name']
+            current[name] = s
+            known = self._known.get(name)
+            if not self._all_dirty and id(s) not in self._dirty_skins and known and known[0] is s:
+                continue
+            text = _compact(s)
+            if not known or known[1] != text:
+                records.append({'op': 'skin', 'name': name, 'data': s})
+            self._known[name] = (s, text)
+        for name in [n for n in self._known if n not in current]:
+            records.append({'op': 'drop', 'name': name})
+            del self._known[name]
+        for key, value in sections.items():
+            if self._all_dirty or key in self._dirty_sections:
+                text = _compact(value)
+                if self._known_sections.get(key) != text:
+                    records.append({'op': 'section', 'key': key, 'data': value})
+                    self._known_sections[key] = text
+
+        self._order = list(skins)
+        self._dirty_skins.clear()
+        self._dirty_sections.clear()
+        self._all_dirty = False
+        if not records: return False
+        try:
+            self._append(records)
+        except BaseException:
+            self._order = None
+            self._known = {}
+            raise
+        return True
+
+    def compact(self, skins, sections):
+        # 先写完整快照再删日志；两步之间崩溃也只会重放一遍幂等的记录
+        super().compact(skins, sections)
+        if os.path.exists(self.journal_path): os.remove(self.journal_path)
+        self._known = {s['name']: (s, _compact(s)) for s in skins}
+        self._known_sections = {k: _compact(v) for k, v in sections.items()}
+        self._compact_pending = False
+        return True
+
+    def history(self, name):
+        """某个皮肤在日志中的历史版本 [(ts, data), ...]"""
+        return [(rec.get('ts'), rec['data']) for rec in self._read_journal()
+                if rec.get('op') == 'skin' and rec.get('name') == name]
+
+
+# 单独成列 (并建索引) 的标记字段
+FLAG_COLUMNS = tuple(hok_schema.FLAG_DEFAULTS)
+
+
+class SqliteStore(JsonStore):
+    """
+    SQLite 模式：皮肤按行存在 data.sqlite3 (WAL)，每次落盘只在一个事务里写真正变了的行
+    - name 为主键；品质、各标记与销售额排序权重单独成列并建索引，query() 的筛选和排序直接走索引
+    - 数据库为空时从 data.json 导入；compact() 把当前数据导出为 data.json
+    weight: 销售额字符串 -> 排序权重 (与 SkinSystem 的排名一致)
+    """
+
+    def __init__(self, path, weight):
+        super().__init__(path)
+        self.db_path = os.path.splitext(path)[0] + '.sqlite3'
+        self.weight = weight
+        self.lock = threading.Lock()  # 多个 Streamlit 会话共用一个连接
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._known = {}  # name -> 最近一次写入的紧凑序列化
+        self._known_sections = {}
+        self._importing = False
+        self._init_db()
+
+    def _init_db(self):
+        flag_defs = ''.join(f", {f} INTEGER NOT NULL" for f in FLAG_COLUMNS)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS skins (name TEXT PRIMARY KEY, quality REAL, "
+                              f"quality_key TEXT{flag_defs}, weight REAL NOT NULL, data TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sections (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS skins_rank ON skins (is_hidden, weight DESC)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS skins_quality ON skins (quality, is_hidden, weight DESC)")
+            for f in FLAG_COLUMNS:
+                if f != 'is_hidden':
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS skins_{f} ON skins ({f}, is_hidden, weight DESC)")
+
+    def _row(self, skin, text):
+        try:
+            quality = float(skin.get('quality'))
+        except (TypeError, ValueError):
+            quality = None
+        flags = tuple(int(bool(skin.get(f, d))) for f, d in hok_schema.FLAG_DEFAULTS.items())
+        return (skin['name'], quality, skin.get('quality_key'), *flags, self.weight(skin.get('revenue')), text)
+
+    def signature(self):
+        """其他连接 (进程) 提交过写入后 data_version 会变；自己的写入不改变它"""
+        with self.lock:
+            return 'sqlite', self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT data FROM skins ORDER BY is_hidden, weight DESC, rowid").fetchall()
+            sections = self.conn.execute("SELECT key, data FROM sections").fetchall()
+        if not rows and not sections:
+            data = super().load()  # 首次使用：从 data.json 导入
+            self._importing = data is not None
+            return data
+        self._importing = False
+        data = {'skins': [json.loads(text) for text, in rows]}
+        data.update((key, json.loads(text)) for key, text in sections)
+        return data
+
+    def adopt(self, skins, sections=None, migrated=False):
+        super().adopt(skins, migrated=migrated)
+        if self._importing or migrated:
+            self._known, self._known_sections = {}, {}
+            self._all_dirty = True  # 刚从 data.json 导入或做过迁移，第一次 flush 写入全部行
+        else:
+            self._known = {s['name']: _compact(s) for s in skins}
+            self._known_sections = {k: _compact(v) for k, v in (sections or {}).items()}
+
+    def flush(self, skins, sections):
+        same_order = self._same_order(skins)
+        if not self.is_dirty and same_order: return False
+
+        rows, known = [], {}
+        for s in skins:
+            name = s['name']
+            if not self._all_dirty and id(s) not in self._dirty_skins and name in self._known: continue
+            text = _compact(s)
+            if self._known.get(name) != text:
+                rows.append(self._row(s, text))
+                known[name] = text
+        drops = []
+        if not same_order:  # 顺序变了才可能有删除
+            current = {s['name'] for s in skins}
+            drops = [n for n in self._known if n not in current]
+        section_rows = []
+        for key, value in sections.items():
+            if self._all_dirty or key in self._dirty_sections or key not in self._known_sections:
+                text = _compact(value)
+                if self._known_sections.get(key) != text: section_rows.append((key, text))
+
+        if rows or drops or section_rows:
+            cols = ('name', 'quality', 'quality_key', *FLAG_COLUMNS, 'weight', 'data')
+            upsert = (f"INSERT INTO skins ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                      f"ON CONFLICT(name) DO UPDATE SET " + ', '.join(f"{c} = excluded.{c}" for c in cols[1:]))
+            with self.lock, self.conn:  # 一次落盘一个事务 (单条修改即单行事务)
+                self.conn.executemany(upsert, rows)
+                self.conn.executemany("DELETE FROM skins WHERE name = ?", [(n,) for n in drops])
+                self.conn.executemany("INSERT INTO sections (key, data) VALUES (?, ?) "
+                                      "ON CONFLICT(key) DO UPDATE SET data = excluded.data", section_rows)
+            self._known.update(known)
+            for n in drops:
+                del self._known[n]
+            self._known_sections.update(section_rows)
+
+        self._order = list(skins)
+        self._dirty_skins.clear()
+        self._dirty_sections.clear()
+        self._all_dirty = False
+        return bool(rows or drops or section_rows)
+
+    def compact(self, skins, sections):
+        """先把未落盘的修改写进数据库，再导出完整的 data.json"""
+        self.flush(skins, sections)
+        JsonStore.compact(self, skins, sections)
+        return True
+
+    def query(self, quality=None, limit=None, **flags):
+        """
+        按品质 / 标记筛选的皮肤名，按 (是否隐藏, 销售额权重降序) 排列
+        例: query(is_preset=True)、query(quality=500, is_hidden=False, limit=20)
+        """
+        where, args = [], []
+        for f, v in flags.items():
+            if f not in FLAG_COLUMNS: raise ValueError(f"未知标记: {f}")
+            where.append(f"{f} = ?")
+            args.append(int(bool(v)))
+        if quality is not None:
+            where.append("quality = ?")
+            args.append(float(quality))
+        sql = "SELECT name FROM skins" + (" WHERE " + " AND ".join(where) if where else "") + \
+              " ORDER BY is_hidden, weight DESC, rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self.lock:
+            return [name for name, in self.conn.execute(sql, args)]
+
+
+def open_store(mode, path, weight=None):
+    if mode == 'journal': return JournalStore(path)
+    if mode == 'sqlite': return SqliteStore(path, weight)
+    return JsonStore(path)
@@ -1,46 +1,38 @@
 import streamlit as st
 import pandas as pd
 import os
-import subprocess
+import json
 import time
-import math
 import hok_logic  # 🔥 核心：导入逻辑层
+import hok_columns
+import hok_profile
 
 # ================= 🚀 Streamlit 界面逻辑 =================
 
 st.set_page_config(page_title="王者皮肤榜单管理", page_icon="👑", layout="wide")
 
-# 初始化系统实例
-if 'app' not in st.session_state:
-    st.session_state.app = hok_logic.SkinSystem()
-
-app = st.session_state.app
-
-
-# --- 🛠️ 强制英文单位格式化工具 (K/M/B) ---
-def format_to_english_unit(val):
-    if val is None or (isinstance(val, float) and math.isnan(val)):
-        return "0"
-    try:
-        f_val = float(val)
-        if f_val >= 1000000000:
-            return f"{f_val / 1000000000:.2f}B"
-        elif f_val >= 1000000:
-            return f"{f_val / 1000000:.2f}M"
-        elif f_val >= 1000:
-            return f"{f_val / 1000:.2f}K"
-        else:
-            return str(int(f_val)) if f_val.is_integer() else str(round(f_val, 2))
-    except:
-        return str(val)
+# 性能剖析：地址栏加 ?perf=1 开启计时，?perf=mem 同时统计内存 (tracemalloc)，并显示隐藏的性能页
+perf_mode = st.query_params.get("perf")
+if perf_mode:
+    hok_profile.start(trace_memory=(perf_mode == "mem"))
+
+# 初始化系统实例：进程内所有浏览器会话共用一个 SkinSystem，只加载 / 扫描一次
+@st.cache_resource
+def get_app():
+    return hok_logic.SkinSystem()
+
+
+app = get_app()
+app.reload_if_stale()  # 数据文件被命令行等其他进程改过时才重新加载
 
 
 # ----------------- 顶部导航 -----------------
 tab_list = ["📊 概览", "➕ 添加", "🕒 预设", "✏️ 编辑", "💎 品质", "🚀 发布"]
-t1, t2, t3, t4, t5, t6 = st.tabs(tab_list)
+if perf_mode: tab_list.append("⏱ 性能")
+t1, t2, t3, t4, t5, t6, *t_perf = st.tabs(tab_list)
 
 # ----------------- Tab 1: 概览 -----------------
-with t1:
+with t1, hok_profile.span("Tab 1: 概览"):
     col_ctrl1, col_ctrl2 = st.columns([0.2, 0.8])
     with col_ctrl1:
         show_active = st.toggle("只看活跃皮肤", value=True)
@@ -48,30 +40,11 @@ with t1:
         st.subheader("🔥 实时皮肤榜单概览" if show_active else "📚 完整皮肤库存")
     st.divider()
 
-    data_list = app.get_active_leaderboard() if show_active else app.get_total_skins()
+    df = app.skin_frame(active=show_active)
 
-    if not data_list:
+    if df.empty:
         st.info("暂无数据")
     else:
-        df = pd.DataFrame(data_list)
-        df.index = df.index + 1
-
-
-        def get_tag(row):
-            if row.get('is_hidden'): return "🚫隐藏"
-            if row.get('is_pool'): return "🎲祈愿"
-            if row.get('is_discontinued'): return "💀绝版"
-            if row.get('is_preset'): return "🕒预设"
-            if row.get('is_rerun'): return "🔵返场"
-            if row.get('is_new'): return "🟡新品"
-            return ""
-
-
-        df['tag'] = df.apply(get_tag, axis=1)
-        df['quality_name'] = df['quality'].apply(
-            lambda x: app.quality_config.get(str(int(x)) if isinstance(x, (int, float)) else str(x), {}).get('name',
-                                                                                                             "未知"))
-
         column_config = {
             "name": st.column_config.TextColumn("皮肤名称", width="medium"),
             "quality_name": st.column_config.TextColumn("品质", width="small"),
@@ -85,7 +58,7 @@ with t1:
         st.dataframe(df[display_cols], column_config=column_config, use_container_width=True, height=600)
 
 # ----------------- Tab 2: 添加皮肤 -----------------
-with t2:
+with t2, hok_profile.span("Tab 2: 添加"):
     q_mode = st.radio("品质来源", ["默认品质", "新建品质"], horizontal=True, label_visibility="collapsed")
     final_q_code = None
     final_list_price = 0.0
@@ -136,12 +109,13 @@ with t2:
         rev_mode = st.radio("录入模式", ["计算", "手动", "锚定"], horizontal=True, label_visibility="collapsed")
 
         final_rev = "0"
+        new_anchor = None
         if rev_mode == "计算":
             if st.button("🔄 自动计算 (转为K/M/B)"):
                 p = app.parse_revenue_str(real_price)
                 v = app.parse_revenue_str(sales_vol)
                 if p > 0 and v > 0:
-                    final_rev = format_to_english_unit(p * v)
+                    final_rev = hok_logic.format_to_english_unit(p * v)
                     st.success(f"计算结果: {final_rev}")
                 else:
                     st.warning("无效数据")
@@ -149,12 +123,12 @@ with t2:
             final_rev = st.text_input("直接输入数值", value="0")
         else:
             # 🔥 恢复：添加页面的锚定功能
-            all_names = [s['name'] for s in app.all_skins]
             c_link1, c_link2 = st.columns(2)
-            starget = c_link1.selectbox("参照皮肤", all_names)
+            starget = c_link1.selectbox("参照皮肤", app.skin_names())
             sop = c_link2.radio("关系", [">", "<", "≈"], horizontal=True)
-            vt = next((s['revenue'] for s in app.all_skins if s['name'] == starget), "0")
-            final_rev = f"{sop}{vt}"
+            # 保存的是对参照皮肤的引用，参照皮肤的销售额变动后会自动跟着更新
+            new_anchor = {"op": sop, "ref": starget}
+            final_rev = app.preview_anchor(new_anchor) or "0"
             st.info(f"生成锚定: {final_rev}")
 
         if st.button("💾 确认添加皮肤", type="primary", use_container_width=True):
@@ -170,25 +144,26 @@ with t2:
                     "real_price": real_price, "sales_volume": sales_vol, "revenue": final_rev, "is_hidden": False,
                     "local_img": None
                 }
-                app.all_skins.append(new_skin)
-                app.save_data()
-                st.success("添加成功！")
-                time.sleep(0.5)
-                st.rerun()
+                if new_anchor: new_skin["anchor"] = new_anchor
+                if app.add_skin(new_skin) is None:
+                    st.error(f"已存在同名皮肤: {name}")
+                else:
+                    st.success("添加成功！")
+                    time.sleep(0.5)
+                    st.rerun()
     with col_r:
         st.caption("活跃榜参考")
-        st.dataframe(pd.DataFrame(app.get_active_leaderboard())[['name', 'revenue']].head(10), use_container_width=True)
+        st.dataframe(app.skin_frame(active=True)[['name', 'revenue']].head(10), use_container_width=True)
 
 # ----------------- Tab 3: 预设上线 -----------------
-with t3:
+with t3, hok_profile.span("Tab 3: 预设"):
     st.subheader("🕒 预设转正上线")
-    presets = [s for s in app.all_skins if s.get('is_preset')]
+    presets = app.find_skins(is_preset=True)
     if not presets:
         st.info("无预设")
     else:
-        skin_names = [s['name'] for s in presets]
         selected_name = st.selectbox("选择要上线的皮肤", [s['name'] for s in presets])
-        target = next((s for s in presets if s['name'] == selected_name), None)
+        target = app.get_skin(selected_name)
         if target:
             c1, c2, c3 = st.columns(3)
             p_price = c1.text_input("最终售价", value=str(target.get('real_price', '0')))
@@ -201,53 +176,55 @@ with t3:
             rev_mode_p = c4.radio("方式", ["计算", "锚定"], horizontal=True, label_visibility="collapsed")
 
             final_p_rev = "0"
+            p_anchor = None
             if rev_mode_p == "计算":
                 if c5.button("自动计算"):
                     v_p = app.parse_revenue_str(p_price)
                     v_s = app.parse_revenue_str(p_sales)
-                    final_p_rev = format_to_english_unit(v_p * v_s)
+                    final_p_rev = hok_logic.format_to_english_unit(v_p * v_s)
                     st.success(f"{final_p_rev}")
                 else:
                     final_p_rev = c5.text_input("或手动输入", value="0")
             else:
-                all_names = [s['name'] for s in app.all_skins]
-                starget = c5.selectbox("参照", all_names, key="pre_t")
+                starget = c5.selectbox("参照", app.skin_names(), key="pre_t")
                 sop = c5.radio("op", [">", "<"], horizontal=True, key="pre_o")
-                vt = next((s['revenue'] for s in app.all_skins if s['name'] == starget), "0")
-                final_p_rev = f"{sop}{vt}"
+                p_anchor = {"op": sop, "ref": starget}
+                final_p_rev = app.preview_anchor(p_anchor) or "0"
                 st.info(f"锚定: {final_p_rev}")
 
             if st.button("🚀 确认发布上线", type="primary"):
-                target['is_preset'] = False;
-                target['is_new'] = True;
-                target['is_hidden'] = False
-                target['real_price'] = p_price;
-                target['sales_volume'] = p_sales;
-                target['growth'] = p_growth
-                target['revenue'] = final_p_rev
-                app.save_data()
-                st.success("已发布！")
-                time.sleep(0.5)
-                st.rerun()
+                # 锚定校验不通过时整个发布都不生效，不会留下改了一半的皮肤
+                ok, msg = app.set_revenue(selected_name, final_p_rev, anchor=p_anchor, updates={
+                    'is_preset': False, 'is_new': True, 'is_hidden': False,
+                    'real_price': p_price, 'sales_volume': p_sales, 'growth': p_growth})
+                if ok:
+                    st.success("已发布！")
+                    time.sleep(0.5)
+                    st.rerun()
+                else:
+                    st.error(msg)
 
 # ----------------- Tab 4: 数据编辑 -----------------
-with t4:
+with t4, hok_profile.span("Tab 4: 编辑"):
     st.header("✏️ 全局数据编辑器")
 
     # 🔥 恢复：【单个皮肤锚定修改】功能块
     with st.expander("🛠️ 单个皮肤锚定修改 (推荐用于调整排名)", expanded=True):
         col_edit1, col_edit2 = st.columns(2)
-        all_skin_names = [s['name'] for s in app.all_skins]
+        all_skin_names = app.skin_names()
 
         edit_target_name = col_edit1.selectbox("选择要修改的皮肤", all_skin_names, key="edit_target_select")
-        edit_target_skin = next((s for s in app.all_skins if s['name'] == edit_target_name), None)
+        edit_target_skin = app.get_skin(edit_target_name)
 
         if edit_target_skin:
-            col_edit2.info(f"当前销售额: **{edit_target_skin.get('revenue', '0')}**")
+            anchor_text = hok_logic.anchor_label(edit_target_skin.get('anchor'))
+            col_edit2.info(f"当前销售额: **{edit_target_skin.get('revenue', '0')}**" +
+                           (f"（锚定 {anchor_text}）" if anchor_text else ""))
 
             edit_rev_mode = st.radio("修改模式", ["直接输入", "锚定范围 (A~B)", "锚定单品 (>A)"], horizontal=True,
                                      key="edit_rev_mode_select")
             final_edit_rev = edit_target_skin.get('revenue', '0')
+            edit_anchor = None
 
             if edit_rev_mode == "直接输入":
                 final_edit_rev = st.text_input("新销售额", value=final_edit_rev, key="edit_rev_direct")
@@ -256,52 +233,46 @@ with t4:
                 ce_a, ce_b = st.columns(2)
                 sa = ce_a.selectbox("下限皮肤", all_skin_names, key="edit_anchor_a")
                 sb = ce_b.selectbox("上限皮肤", all_skin_names, key="edit_anchor_b")
-                va = next((s['revenue'] for s in app.all_skins if s['name'] == sa), "?")
-                vb = next((s['revenue'] for s in app.all_skins if s['name'] == sb), "?")
-                final_edit_rev = f"{va}~{vb}"
+                edit_anchor = {"lo": sa, "hi": sb}
+                final_edit_rev = app.preview_anchor(edit_anchor) or "?"
                 st.info(f"预览: {final_edit_rev}")
 
             elif edit_rev_mode == "锚定单品 (>A)":
                 ce_t, ce_o = st.columns(2)
                 stgt = ce_t.selectbox("对象", all_skin_names, key="edit_anchor_t")
                 sop = ce_o.radio("关系", [">", "<"], horizontal=True, key="edit_anchor_op")
-                vt = next((s['revenue'] for s in app.all_skins if s['name'] == stgt), "?")
-                final_edit_rev = f"{sop}{vt}"
+                edit_anchor = {"op": sop, "ref": stgt}
+                final_edit_rev = app.preview_anchor(edit_anchor) or "?"
                 st.info(f"预览: {final_edit_rev}")
 
+            demote = st.checkbox(f"跌出前 {hok_logic.LEADERBOARD_CAPACITY} 名的皮肤自动撤下活跃榜", value=False,
+                                 key="edit_demote")
             if st.button(f"💾 更新 [{edit_target_name}] 销售额", type="primary", key="edit_save_btn"):
-                edit_target_skin['revenue'] = final_edit_rev
-                app.auto_prune_leaderboard()  # 重新排序
-                app.save_data()
-                st.success("更新成功！")
-                time.sleep(0.5)
-                st.rerun()
+                with app.batch():
+                    # 依赖它的锚定皮肤一并更新，排名索引随之增量调整
+                    ok, msg = app.set_revenue(edit_target_name, final_edit_rev, anchor=edit_anchor)
+                    demoted = app.auto_prune_leaderboard(demote=demote) if ok else []
+                if ok:
+                    st.success("更新成功！" + (f" 撤下活跃榜: {', '.join(s['name'] for s in demoted)}" if demoted else ""))
+                    time.sleep(0.5)
+                    st.rerun()
+                else:
+                    st.error(msg)
 
     st.divider()
     st.info("💡 提示：勾选 '隐藏' 可在网站隐藏该皮肤。如需删除，选中行左侧勾选框后按 Delete。")
 
-    df_edit = pd.DataFrame(app.all_skins)
-
-
-    def get_tag_label(row):
-        if row.get('is_pool'): return "祈愿"
-        if row.get('is_discontinued'): return "绝版"
-        if row.get('is_preset'): return "预设"
-        if row.get('is_rerun'): return "返场"
-        if row.get('is_new'): return "新品"
-        return "无"
+    df_edit = app.skin_frame()
 
-
-    df_edit['badge_label'] = df_edit.apply(get_tag_label, axis=1)
-
-    column_order = ["name", "sales_volume", "revenue", "real_price", "growth", "badge_label", "quality", "list_price",
-                    "is_hidden"]
+    column_order = ["name", "sales_volume", "revenue", "anchor_label", "real_price", "growth", "badge_label", "quality",
+                    "list_price", "is_hidden"]
     config = {
         "name": st.column_config.TextColumn("名称", width="medium"),
         "badge_label": st.column_config.SelectboxColumn("角标", options=["无", "新品", "返场", "预设", "绝版", "祈愿"],
                                                         width="small"),
         "quality": st.column_config.NumberColumn("代码", format="%g"),
         "list_price": st.column_config.NumberColumn("积分", disabled=True),
+        "anchor_label": st.column_config.TextColumn("锚定", disabled=True),
         "growth": st.column_config.NumberColumn("涨幅%", format="%.1f"),
         "is_hidden": st.column_config.CheckboxColumn("隐藏?")
     }
@@ -313,7 +284,7 @@ with t4:
     do_clean = c_s2.checkbox("🧹 强制格式化：将所有数据重洗为 K/M/B (去除中文单位)", value=True)
 
     if c_s1.button("💾 保存并执行操作"):
-        updated = edited_df.to_dict(orient='records')
+        updated = hok_columns.frame_to_records(edited_df)
         recalc_count = 0
         for item in updated:
             tag = item.get('badge_label', "无")
@@ -324,28 +295,15 @@ with t4:
             item['is_new'] = (tag == "新品")
             if 'badge_label' in item: del item['badge_label']
 
-            if do_clean:
-                try:
-                    val_p = app.parse_revenue_str(item.get('real_price', '0'))
-                    val_v = app.parse_revenue_str(item.get('sales_volume', '0'))
-
-                    if val_v > 0:
-                        item['sales_volume'] = format_to_english_unit(val_v)
-
-                    current_rev = str(item.get('revenue', ''))
-                    # 仅当非锚定数据时才自动重算覆盖
-                    if val_p > 0 and val_v > 0 and not ('>' in current_rev or '~' in current_rev or '<' in current_rev):
-                        item['revenue'] = format_to_english_unit(val_p * val_v)
-                        recalc_count += 1
-                except:
-                    pass
-
-        app.all_skins = updated
-        app._migrate_data_structure()
+        if do_clean:
+            recalc_count, diff = hok_columns.recompute(updated)
+        app.replace_skins(updated)
         st.success(f"✅ 保存完成！已重洗格式化 {recalc_count} 条营收数据。")
+        if do_clean and len(diff):
+            st.dataframe(diff, use_container_width=True)
 
 # ----------------- Tab 5: 品质管理 -----------------
-with t5:
+with t5, hok_profile.span("Tab 5: 品质"):
     st.header("💎 品质配置")
     q_df = pd.DataFrame.from_dict(app.quality_config, orient='index')
     q_df.index.name = 'code'
@@ -361,18 +319,16 @@ with t5:
             qcol = c4.color_picker("颜色");
             qpar = c5.text_input("父级")
             if st.form_submit_button("保存"):
-                app.quality_config[qc] = {"price": qp, "name": qn, "parent": qpar, "scale": 1.0, "bg_color": qcol}
-                app.save_data();
+                app.set_quality(qc, {"price": qp, "name": qn, "parent": qpar, "scale": 1.0, "bg_color": qcol})
                 st.rerun()
     with st.expander("🗑️ 删除"):
         dels = st.multiselect("选择删除", list(app.quality_config.keys()))
         if st.button("确认删除"):
-            for d in dels: del app.quality_config[d]
-            app.save_data();
+            app.delete_qualities(dels)
             st.rerun()
 
 # ----------------- Tab 6: 发布 -----------------
-with t6:
+with t6, hok_profile.span("Tab 6: 发布"):
     st.header("🚀 发布工具")
     st.divider()
     col1, col2, col3 = st.columns(3)
@@ -381,6 +337,20 @@ with t6:
             s, m = app.generate_html();
             st.success(m) if s else st.error(m)
 
+    with col2:
+        if st.button("🖼️ 批量补全头像"):
+            with st.spinner("爬取中..."):
+                report = app.fetch_missing_avatars()
+            st.success(f"完成 {len(report['ok'])} 个，失败 {len(report['failed'])} 个，用时 {report['elapsed']:.1f}s")
+            if report['failed']:
+                st.dataframe(pd.DataFrame(report['failed'], columns=["皮肤", "原因"]), use_container_width=True)
+
+        if hok_logic.STORAGE_MODE in ("journal", "sqlite"):
+            st.markdown("**变动日志**" if hok_logic.STORAGE_MODE == "journal" else "**SQLite 数据库**")
+            if st.button("🗜️ 压缩日志到 data.json" if hok_logic.STORAGE_MODE == "journal" else "📤 导出 data.json"):
+                s, m = app.compact_storage()
+                st.success(m) if s else st.error(m)
+
     with col3:
         st.markdown("**Git 代理**")
         port = st.text_input("端口", "7897")
@@ -389,20 +359,27 @@ with t6:
             st.session_state.auto_proxy = True
 
         if st.button("🚀 Push 到 GitHub 并生成链接", type="primary", use_container_width=True):
-            app.generate_html()
-            os.chdir(hok_logic.LOCAL_REPO_PATH)
-            try:
-                try:
-                    subprocess.run([hok_logic.GIT_EXECUTABLE_PATH, "add", "."], check=True)
-                    subprocess.run([hok_logic.GIT_EXECUTABLE_PATH, "commit", "-m", "sync via dashboard"], check=True)
-                except:
-                    pass
-                result = subprocess.run([hok_logic.GIT_EXECUTABLE_PATH, "push"], capture_output=True, text=True)
-                if result.returncode == 0:
-                    st.success(f"✅ 发布成功！")
-                    st.markdown(
-                        f"### 🔗 点击访问：\n[https://{hok_logic.GITHUB_USERNAME}.github.io/hok-rank/](https://{hok_logic.GITHUB_USERNAME}.github.io/hok-rank/)")
-                else:
-                    st.error(f"推送失败: {result.stderr}")
-            except Exception as e:
-                st.error(f"Error: {e}")
\ No newline at end of file
+            with st.spinner("发布中..."):
+                s, m = app.publish()
+            if s:
+                st.success(m)
+                st.markdown(
+                    f"### 🔗 点击访问：\n[https://{hok_logic.GITHUB_USERNAME}.github.io/hok-rank/](https://{hok_logic.GITHUB_USERNAME}.github.io/hok-rank/)")
+            else:
+                st.error(m)
+
+# ----------------- 隐藏页: 性能 -----------------
+if t_perf:
+    with t_perf[0]:
+        collector = hok_profile.stop()
+        history = st.session_state.setdefault('perf_history', [])
+        history.append(collector.to_dict())
+        del history[:-20]  # 只保留最近 20 次 rerun
+        st.header("⏱ 本次运行各阶段耗时")
+        st.caption(f"总耗时 {collector.wall * 1e3:.1f} ms（不含本页）；共享实例只在首次加载时计入 SkinSystem.__init__")
+        st.dataframe(pd.DataFrame(collector.report()), use_container_width=True, height=500)
+        c_p1, c_p2 = st.columns(2)
+        c_p1.download_button("📥 导出本次 JSON", collector.to_json(), file_name="hok_profile.json",
+                             mime="application/json")
+        c_p2.download_button("📥 导出最近 20 次 JSON", json.dumps(history, ensure_ascii=False, indent=2),
+                             file_name="hok_profile_history.json", mime="application/json")
@@ -92,74 +92,50 @@ HTML_TEMPLATE = """
         .growth-down { color: #991b1b !important; } .growth-up-mid { color: #16a34a !important; } .growth-up-high { color: #ea580c !important; } .growth-special { color: #a855f7 !important; font-weight: 900 !important; }
         .header-gifs-container { display: flex; gap: 10px; }
         .header-gif { width: 55px; height: 55px; border-radius: 8px; object-fit: cover; border: 2px solid rgba(255,255,255,0.4); }
+        .page-nav { display: flex; flex-wrap: wrap; justify-content: center; gap: 6px; padding: 12px 10px 0; }
+        .page-nav a { font-size: 12px; font-weight: 700; color: #6366f1; text-decoration: none; padding: 4px 10px; border: 1px solid #c7d2fe; border-radius: 12px; }
+        .page-nav a.current { background: #6366f1; color: #fff; }
+        {% block extra_style %}{% endblock %}
     </style>
 </head>
 <body>
     <div class="chart-card">
         <div class="chart-header">
-            <div class="header-gifs-container">{% for g in header_gifs[:2] %}<img src="./show/{{ g }}" class="header-gif">{% endfor %}</div>
+            <div class="header-gifs-container">{% for g in header_gifs[:2] %}<img src="{{ g }}" class="header-gif">{% endfor %}</div>
             <div class="header-content">
                 <h1>Honor of Kings Skin Revenue Forecast</h1>
                 <div class="info-container"><p>Update: {{ update_time }}</p><button class="info-btn" onclick="openModal()">说明</button></div>
             </div>
-            <div class="header-gifs-container">{% for g in header_gifs[2:4] %}<img src="./show/{{ g }}" class="header-gif">{% endfor %}</div>
+            <div class="header-gifs-container">{% for g in header_gifs[2:4] %}<img src="{{ g }}" class="header-gif">{% endfor %}</div>
         </div>
+        {% if pages|length > 1 %}<div class="page-nav">{% for href, title in pages %}<a href="./{{ href }}"{% if href == current_page %} class="current"{% endif %}>{{ title }}</a>{% endfor %}</div>{% endif %}
         <div class="table-container">
             <table id="skinTable">
                 <thead>
                     <tr>
-                        <th class="col-sort" onclick="sortTable(0, 'int')">No</th>
+                        <th class="col-sort" onclick="sortTable(0)">No</th>
                         <th><div class="qual-header"><div id="multiSelectBtn" class="multi-select-box" onclick="toggleMenu(event)">全部品质</div>
                             <div id="dropdownMenu" class="dropdown-menu">
                                 <label class="dropdown-item"><input type="checkbox" id="selectAll" value="all" checked onchange="handleSelectAll(this)"> 全选</label><hr>
                                 {% for q in quality_config.values()|map(attribute='name')|unique %}
                                 <label class="dropdown-item"><input type="checkbox" class="q-check" value="{{ q }}" onchange="handleSingleSelect(this)"> {{ q }}</label>
                                 {% endfor %}
-                            </div><span class="col-sort" onclick="sortTable(1, 'float')"></span></div></th>
+                            </div><span class="col-sort" onclick="sortTable(1)"></span></div></th>
                         <th style="text-align:left; padding-left:20px;">Skin Name</th>
                         <th></th>
-                        <th class="col-sort" onclick="sortTable(4, 'float')">销量</th>
-                        <th class="col-sort" onclick="sortTable(5, 'float')">销售额</th>
-                        <th class="col-sort" onclick="sortTable(6, 'float')">Growth</th>
-                        <th class="col-sort" onclick="sortTable(7, 'float')">万象积分</th>
-                        <th class="col-sort" onclick="sortTable(8, 'float')">售价</th>
+                        <th class="col-sort" onclick="sortTable(4)">销量</th>
+                        <th class="col-sort sort-desc" onclick="sortTable(5)">销售额</th>
+                        <th class="col-sort" onclick="sortTable(6)">Growth</th>
+                        <th class="col-sort" onclick="sortTable(7)">万象积分</th>
+                        <th class="col-sort" onclick="sortTable(8)">售价</th>
                     </tr>
                 </thead>
                 <tbody>
-                    {% for skin in total_skins %}
-                    {% if not skin.is_hidden %}
-                    {% set q_str = skin.quality_key %}
-                    {% set q_cfg = quality_config.get(q_str, {}) %}
-                    {% set parent_id = q_cfg.parent|string if q_cfg.parent else none %}
-                    {% set display_img_id = parent_id if parent_id else q_str %}
-                    {% set root_cfg = quality_config.get(display_img_id, q_cfg) %}
-                    {% set scale_val = q_cfg.get('scale', 1.0) %}
-                    {% set bg_c = root_cfg.get('bg_color', '#ffffff') %}
-                    {% set q_cls = 'rare-wushuang-big' if root_cfg.name == '珍品无双' else ('wushuang-big' if root_cfg.name == '无双' else '') %}
-                    <tr data-quality="{{ q_cfg.name }}">
-                        <td>{% if not skin.is_preset and not skin.is_discontinued %}<span class="rank-box">{{ loop.index }}</span>{% else %}-{% endif %}</td>
-                        <td class="quality-col" data-val="{{ skin.quality }}">
-                            <img src="./images/{{ q_str }}.gif" data-q="{{ q_str }}" data-p="{{ parent_id }}" class="quality-icon {{ q_cls }}" style="transform: scale({{ scale_val }});" onerror="loadFallbackImg(this)">
-                        </td>
-                        <td class="rounded-left" style="background-color: {{ bg_c }};"><div class="song-col">
-                            <img src="./{{ skin.local_img or 'placeholder.jpg' }}" class="album-art">
-                            <div class="name-container"><span class="song-title">{{ skin.name }}</span>
-                                {% if skin.is_pool %}<span class="badge badge-pool">祈愿</span>
-                                {% elif skin.is_discontinued %}<span class="badge badge-out">Out of Print</span>
-                                {% elif skin.is_preset %}<span class="badge badge-preset">Coming Soon</span>
-                                {% elif skin.is_new %}<span class="badge badge-new">New Arrival</span>
-                                {% elif skin.is_rerun %}<span class="badge badge-return">Limit Return</span>{% endif %}
-                            </div>
-                        </div></td>
-                        <td class="desc-col" style="background-color: {{ bg_c }};">{% if skin.desc_img %}<img src="./skin_descs/{{ skin.desc_img }}" class="desc-img">{% endif %}</td>
-                        <td style="background-color: {{ bg_c }};"><div class="box-style">{{ skin.sales_volume }}</div></td>
-                        <td style="background-color: {{ bg_c }}; color:#6366f1; font-weight:bold;">{{ skin.revenue }}</td>
-                        <td style="background-color: {{ bg_c }};">{% if skin.growth %}{% set g_cls = 'growth-special' if skin.growth == 1.9 else ('growth-down' if skin.growth < 0 else ('growth-up-high' if skin.growth >= 10 else ('growth-up-mid' if skin.growth >= 5 else ''))) %}<div class="box-style {{ g_cls }}">{{ skin.growth }}%{% if skin.growth == 1.9 %}!{% endif %}</div>{% else %}--{% endif %}</td>
-                        <td style="background-color: {{ bg_c }};">{{ skin.list_price|int }}</td>
-                        <td class="rounded-right" style="background-color: {{ bg_c }};"><div class="box-style">{{ skin.real_price }}</div></td>
-                    </tr>
-                    {% endif %}
+                    {% block rows %}
+                    {% for head, ranked, body in rows %}{{ head }}
+                        <td data-v="{{ loop.index if ranked else -1 }}">{% if ranked %}<span class="rank-box">{{ loop.index }}</span>{% else %}-{% endif %}</td>{{ body }}
                     {% endfor %}
+                    {% endblock %}
                 </tbody>
             </table>
         </div>
@@ -172,27 +148,15 @@ HTML_TEMPLATE = """
     function toggleMenu(e) { e.stopPropagation(); document.getElementById('dropdownMenu').classList.toggle('show'); }
     document.addEventListener('click', () => document.getElementById('dropdownMenu').classList.remove('show'));
     document.getElementById('dropdownMenu').addEventListener('click', (e) => e.stopPropagation());
-    window.onload = () => { sortTable(5, 'float'); adjustNameFontSize(); };
+    {% block table_script %}
+    // 行已按销售额在服务端排好序，加载时不再排序
+    window.onload = adjustNameFontSize;
     function adjustNameFontSize() {
-        const containers = document.querySelectorAll('.name-container'); const maxWidth = 90; 
-        containers.forEach(container => {
-            const title = container.querySelector('.song-title');
-            if (title) {
-                title.style.transform = 'none';
-                if (title.scrollWidth > maxWidth) {
-                    const scale = maxWidth / title.scrollWidth;
-                    title.style.transform = `scale(${scale})`;
-                }
-            }
-        });
-    }
-    function loadFallbackImg(img) {
-        const q = img.getAttribute('data-q');
-        const p = img.getAttribute('data-p');
-        const src = img.src;
-        if (src.indexOf(q + '.gif') !== -1) { img.src = './images/' + q + '.jpg'; }
-        else if (src.indexOf(q + '.jpg') !== -1 && p && p !== 'None') { img.src = './images/' + p + '.gif'; }
-        else if (p && src.indexOf(p + '.gif') !== -1) { img.src = './images/' + p + '.jpg'; }
+        // 先统一写、再统一读、最后统一写，整个过程只触发一次布局计算
+        const titles = Array.from(document.querySelectorAll('.name-container .song-title')); const maxWidth = 90;
+        titles.forEach(t => { t.style.transform = 'none'; });
+        const widths = titles.map(t => t.scrollWidth);
+        titles.forEach((t, i) => { if (widths[i] > maxWidth) t.style.transform = `scale(${maxWidth / widths[i]})`; });
     }
     function handleSelectAll(cb) { if(cb.checked) document.querySelectorAll('.q-check').forEach(c=>c.checked=false); updateFilter(); }
     function handleSingleSelect(cb) { if(cb.checked) document.getElementById('selectAll').checked=false; updateFilter(); }
@@ -205,67 +169,126 @@ HTML_TEMPLATE = """
         });
     }
 
-    // 增强版数字解析：支持 亿/万/B/M/K
-    function parseMixedNum(str) {
-        if (!str) return -999999;
-
-        function parseOne(s) {
-            s = s.toString().replace(/[¥,%,]/g, '').trim().toUpperCase();
-            s = s.replace('>', '').replace('<', ''); 
-
-            let multi = 1;
-            if (s.includes('亿') || s.includes('B')) { 
-                multi = 100000000; 
-                s = s.replace('亿', '').replace('B', ''); 
-            } 
-            else if (s.includes('万')) { 
-                multi = 10000; 
-                s = s.replace('万', ''); 
-            }
-            else if (s.includes('W')) { 
-                multi = 10000; 
-                s = s.replace('W', ''); 
-            }
-            else if (s.includes('M')) { 
-                multi = 1000000; 
-                s = s.replace('M', ''); 
-            }
-            else if (s.includes('K')) { 
-                multi = 1000; 
-                s = s.replace('K', ''); 
-            }
-            let val = parseFloat(s);
-            return isNaN(val) ? 0 : val * multi;
-        }
-
-        if (str.toString().includes('~')) {
-            let parts = str.toString().split('~');
-            return (parseOne(parts[0]) + parseOne(parts[1])) / 2;
-        }
-
-        let val = parseOne(str);
-        if (str.toString().includes('>')) return val + 0.1;
-        if (str.toString().includes('<')) return val - 0.1;
-        return val;
-    }
-
-    function sortTable(n, type) {
-        var table = document.getElementById("skinTable"), rows = Array.from(table.rows).slice(1), headers = table.getElementsByTagName("TH"), dir = "desc";
+    // 排序值由生成脚本写在单元格的 data-v 上 (与 Python 端解析一致)，排序时每行只读一次
+    function sortTable(n) {
+        var table = document.getElementById("skinTable"), tbody = table.tBodies[0], headers = table.getElementsByTagName("TH"), dir = "desc";
         if (headers[n].classList.contains("sort-desc")) dir = "asc";
         Array.from(headers).forEach(h => h.classList.remove("sort-asc", "sort-desc"));
         headers[n].classList.add(dir === "asc" ? "sort-asc" : "sort-desc");
-        rows.sort((a, b) => {
-            var valA = a.cells[n].innerText;
-            var valB = b.cells[n].innerText;
-            var x = parseMixedNum(valA);
-            var y = parseMixedNum(valB);
-
-            if (isNaN(x)) x = -9999999; if (isNaN(y)) y = -9999999;
-            return dir === "asc" ? x - y : y - x;
-        });
-        rows.forEach(r => table.tBodies[0].appendChild(r));
+        var sign = dir === "asc" ? 1 : -1;
+        var decorated = Array.from(tbody.rows, r => [parseFloat(r.cells[n].dataset.v), r]);
+        decorated.sort((a, b) => sign * (a[0] - b[0]));
+        var frag = document.createDocumentFragment();
+        decorated.forEach(d => frag.appendChild(d[1]));
+        tbody.appendChild(frag);
     }
+    {% endblock %}
     </script>
 </body>
 </html>
-"""
\ No newline at end of file
+"""
+# 单行片段：每行只渲染一次，多个页面共用 (排名单元格由各页面自己输出)
+# 一次渲染全部行，每行输出 "<tr ...>" {{ sep }} 其余单元格 {{ sep }}，由 SkinSystem._row_fragments 切开
+ROW_TEMPLATE = """{% for row in rows %}{% set q = row.q %}
+                    <tr data-quality="{{ q.name }}">{{ sep }}
+                        <td class="quality-col" data-v="{{ row.quality_v }}">
+                            {% if q.icon %}<img src="{{ q.icon }}" class="quality-icon {{ q.cls }}" style="transform: scale({{ q.scale }});">{% endif %}
+                        </td>
+                        <td class="rounded-left" style="background-color: {{ q.bg_color }};"><div class="song-col">
+                            <img src="{{ row.avatar }}" class="album-art">
+                            <div class="name-container"><span class="song-title">{{ row.name }}</span>
+                                {% if row.badge %}<span class="badge {{ row.badge[0] }}">{{ row.badge[1] }}</span>{% endif %}
+                            </div>
+                        </div></td>
+                        <td class="desc-col" style="background-color: {{ q.bg_color }};">{% if row.desc %}<img src="{{ row.desc }}" class="desc-img">{% endif %}</td>
+                        <td data-v="{{ row.sales_v }}" style="background-color: {{ q.bg_color }};"><div class="box-style">{{ row.sales_volume }}</div></td>
+                        <td data-v="{{ row.revenue_v }}" style="background-color: {{ q.bg_color }}; color:#6366f1; font-weight:bold;">{{ row.revenue }}</td>
+                        <td data-v="{{ row.growth_v }}" style="background-color: {{ q.bg_color }};">{% if row.growth %}<div class="box-style {{ row.growth_cls }}">{{ row.growth }}%{% if row.growth_cls == 'growth-special' %}!{% endif %}</div>{% else %}--{% endif %}</td>
+                        <td data-v="{{ row.list_price }}" style="background-color: {{ q.bg_color }};">{{ row.list_price }}</td>
+                        <td class="rounded-right" data-v="{{ row.real_v }}" style="background-color: {{ q.bg_color }};"><div class="box-style">{{ row.real_price }}</div></td>
+                    </tr>{{ sep }}{% endfor %}"""
+
+# 虚拟滚动模式：表格行不写进 HTML，而是从 JSON 加载到内存，只渲染可视区域附近的行
+# 行数组字段顺序见 hok_logic.SkinSystem._rows_payload
+VIRTUAL_TEMPLATE = """{% extends "index.html" %}
+{% block extra_style %}.v-pad td { padding: 0 !important; }{% endblock %}
+{% block rows %}{% endblock %}
+{% block table_script %}
+    const V = { all: [], view: [], qualities: [], badges: [], rowH: 0, start: -1, end: -1, pending: false };
+    const BUFFER = 10;  // 可视区域上下多渲染的行数
+    const SORT_FIELDS = {0: 2, 1: 12, 4: 13, 5: 14, 6: 15, 7: 10, 8: 16};  // 表头列号 -> 行数组中的排序值下标
+    fetch('{{ data_url }}').then(r => r.json()).then(d => {
+        V.qualities = d.qualities; V.badges = d.badges; V.all = d.rows; V.view = V.all;
+        window.addEventListener('scroll', scheduleRender, { passive: true });
+        window.addEventListener('resize', () => renderRows(true));
+        renderRows(true);
+    });
+    function esc(v) {
+        return v == null ? '' : String(v).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+    }
+    function rowHtml(r) {
+        const q = V.qualities[r[1]], bg = `background-color: ${q[3]};`, b = r[4] >= 0 ? V.badges[r[4]] : null;
+        return '<tr class="v-row">' +
+            `<td>${r[2] > 0 ? `<span class="rank-box">${r[2]}</span>` : '-'}</td>` +
+            `<td class="quality-col">${q[5] ? `<img src="${q[5]}" class="quality-icon ${q[4]}" style="transform: scale(${q[2]});">` : ''}</td>` +
+            `<td class="rounded-left" style="${bg}"><div class="song-col"><img src="${esc(r[3])}" class="album-art" loading="lazy">` +
+            `<div class="name-container"><span class="song-title">${esc(r[0])}</span>${b ? `<span class="badge ${b[0]}">${b[1]}</span>` : ''}</div></div></td>` +
+            `<td class="desc-col" style="${bg}">${r[5] ? `<img src="${esc(r[5])}" class="desc-img" loading="lazy">` : ''}</td>` +
+            `<td style="${bg}"><div class="box-style">${esc(r[6])}</div></td>` +
+            `<td style="${bg} color:#6366f1; font-weight:bold;">${esc(r[7])}</td>` +
+            `<td style="${bg}">${r[8] ? `<div class="box-style ${r[9]}">${r[8]}%${r[9] === 'growth-special' ? '!' : ''}</div>` : '--'}</td>` +
+            `<td style="${bg}">${r[10]}</td>` +
+            `<td class="rounded-right" style="${bg}"><div class="box-style">${esc(r[11])}</div></td></tr>`;
+    }
+    function padRow(h) {
+        // 每行自带 8px 的 border-spacing，占位行要扣掉
+        return h > 8 ? `<tr class="v-pad"><td colspan="9" style="height:${h - 8}px"></td></tr>` : '';
+    }
+    function scheduleRender() {
+        if (V.pending) return;
+        V.pending = true;
+        requestAnimationFrame(() => { V.pending = false; renderRows(false); });
+    }
+    function renderRows(force) {
+        const tbody = document.getElementById('skinTable').tBodies[0], n = V.view.length;
+        if (!V.rowH && n) {
+            tbody.innerHTML = rowHtml(V.view[0]);
+            V.rowH = tbody.rows[0].getBoundingClientRect().height + 8;
+        }
+        const top = tbody.getBoundingClientRect().top + window.scrollY, rowH = V.rowH || 1;
+        const start = Math.max(0, Math.min(n, Math.floor((window.scrollY - top) / rowH) - BUFFER));
+        const end = Math.max(start, Math.min(n, Math.ceil((window.scrollY + window.innerHeight - top) / rowH) + BUFFER));
+        if (!force && start === V.start && end === V.end) return;
+        V.start = start; V.end = end;
+        tbody.innerHTML = padRow(start * rowH) + V.view.slice(start, end).map(rowHtml).join('') + padRow((n - end) * rowH);
+        adjustNameFontSize();
+    }
+    function adjustNameFontSize() {
+        const titles = Array.from(document.querySelectorAll('.name-container .song-title')); const maxWidth = 90;
+        const widths = titles.map(t => t.scrollWidth);
+        titles.forEach((t, i) => { if (widths[i] > maxWidth) t.style.transform = `scale(${maxWidth / widths[i]})`; });
+    }
+    function applyView() {
+        const main = document.getElementById('selectAll');
+        const checked = Array.from(document.querySelectorAll('.q-check')).filter(c=>c.checked).map(c=>c.value);
+        V.view = (main.checked || checked.length===0) ? V.all : V.all.filter(r => checked.includes(V.qualities[r[1]][1]));
+        renderRows(true);
+    }
+    function updateFilter() {
+        const main = document.getElementById('selectAll');
+        const checked = Array.from(document.querySelectorAll('.q-check')).filter(c=>c.checked).map(c=>c.value);
+        document.getElementById('multiSelectBtn').innerText = (main.checked || checked.length===0) ? "全部品质" : (checked.length===1 ? checked[0] : "筛选中");
+        applyView();
+    }
+    // 排序直接作用在内存数组上 (排序值已由生成脚本算好)
+    function sortTable(n) {
+        var headers = document.getElementById("skinTable").getElementsByTagName("TH"), dir = "desc";
+        if (headers[n].classList.contains("sort-desc")) dir = "asc";
+        Array.from(headers).forEach(h => h.classList.remove("sort-asc", "sort-desc"));
+        headers[n].classList.add(dir === "asc" ? "sort-asc" : "sort-desc");
+        var k = SORT_FIELDS[n], sign = dir === "asc" ? 1 : -1;
+        V.all.sort((a, b) => sign * (a[k] - b[k]));
+        applyView();
+    }
+{% endblock %}
+"""
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hok_logic  # noqa: E402
+
+# v0 结构: 缺字段、数值不是字符串、带旧的 score 字段
+V0_SKINS = [
+    {"quality": 500, "name": "李白-千魇归渊", "revenue": "61.30M", "sales_volume": 1000, "score": 9},
+    {"quality": "50.1", "name": "貂蝉-春霖将至", "revenue": ">21.47M", "price": 128.8, "is_new": 1},
+    {"quality": 7500, "name": "小乔-线条小狗", "revenue": "1.2亿~1.5亿", "growth": "3.5"},
+    {"quality": 100, "name": "伽罗-沧流箭", "revenue": "705.00K", "on_leaderboard": False},
+]
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """临时仓库目录，data.json 为 V0_SKINS"""
+    monkeypatch.setattr(hok_logic, 'LOCAL_REPO_PATH', str(tmp_path))
+    with open(tmp_path / "data.json", "w", encoding="utf-8") as f:
+        json.dump({"skins": V0_SKINS}, f, ensure_ascii=False)
+    return tmp_path
+
+
+@pytest.fixture
+def open_app(repo, monkeypatch):
+    """open_app(mode) -> 指定存储模式下新建的 SkinSystem"""
+    def _open(mode='json'):
+        monkeypatch.setattr(hok_logic, 'STORAGE_MODE', mode)
+        return hok_logic.SkinSystem()
+    return _open
@@ -0,0 +1,68 @@
+# 锚定依赖图：传播、循环拒绝、重新加载，以及导入的销售额覆盖锚定
+
+import pytest
+
+MODES = ('json', 'journal', 'sqlite')
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_anchor_propagation_and_reload(open_app, mode):
+    app = open_app(mode)
+    assert app.set_revenue("伽罗-沧流箭", anchor={"op": ">", "ref": "李白-千魇归渊"})[0]
+    assert app.set_revenue("貂蝉-春霖将至", anchor={"lo": "伽罗-沧流箭", "hi": "小乔-线条小狗"})[0]
+    assert app.get_skin("伽罗-沧流箭")['revenue'] == ">61.30M"
+    assert app.get_skin("貂蝉-春霖将至")['revenue'] == "61.30M~1.2亿"
+
+    # 被引用的皮肤变动后，传递依赖者按拓扑序更新
+    assert app.set_revenue("李白-千魇归渊", "70.00M")[0]
+    assert app.get_skin("伽罗-沧流箭")['revenue'] == ">70.00M"
+    assert app.get_skin("貂蝉-春霖将至")['revenue'] == "70.00M~1.2亿"
+
+    # 循环引用被拒绝，数据不变
+    ok, _ = app.set_revenue("李白-千魇归渊", anchor={"op": "<", "ref": "貂蝉-春霖将至"})
+    assert not ok and 'anchor' not in app.get_skin("李白-千魇归渊")
+
+    reloaded = open_app(mode)
+    assert reloaded.get_skin("貂蝉-春霖将至")['anchor'] == {"lo": "伽罗-沧流箭", "hi": "小乔-线条小狗"}
+    assert reloaded.set_revenue("小乔-线条小狗", "2.0亿")[0]
+    assert reloaded.get_skin("貂蝉-春霖将至")['revenue'] == "70.00M~2.0亿"
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_import_revenue_overrides_anchor(open_app, mode):
+    app = open_app(mode)
+    assert app.set_revenue("伽罗-沧流箭", anchor={"op": ">", "ref": "李白-千魇归渊"})[0]
+    assert app.import_records([{"name": "伽罗-沧流箭", "revenue": "3.00M"}]) == (1, 0, [])
+    skin = app.get_skin("伽罗-沧流箭")
+    assert skin['revenue'] == "3.00M" and 'anchor' not in skin
+
+    # 不再跟随原来的参照皮肤
+    assert app.set_revenue("李白-千魇归渊", "80.00M")[0]
+    assert app.get_skin("伽罗-沧流箭")['revenue'] == "3.00M"
+    assert open_app(mode).get_skin("伽罗-沧流箭")['revenue'] == "3.00M"
+
+
+def test_import_without_revenue_keeps_anchor(open_app):
+    app = open_app()
+    assert app.set_revenue("伽罗-沧流箭", anchor={"op": ">", "ref": "李白-千魇归渊"})[0]
+    app.import_records([{"name": "伽罗-沧流箭", "growth": 2.5}])
+    assert app.set_revenue("李白-千魇归渊", "80.00M")[0]
+    assert app.get_skin("伽罗-沧流箭")['revenue'] == ">80.00M"
+
+
+def test_set_revenue_updates_are_all_or_nothing(open_app):
+    app = open_app()
+    assert app.set_revenue("伽罗-沧流箭", anchor={"op": ">", "ref": "李白-千魇归渊"})[0]
+    before, version = app.get_skin("李白-千魇归渊").to_dict(), app._version
+    publish = {'is_new': True, 'is_hidden': True, 'real_price': "400", 'growth': 5}
+
+    # 循环引用：其他字段也不能先改掉
+    ok, msg = app.set_revenue("李白-千魇归渊", anchor={"op": "<", "ref": "伽罗-沧流箭"}, updates=publish)
+    assert not ok and "循环" in msg
+    assert app.get_skin("李白-千魇归渊").to_dict() == before and app._version == version
+    assert app.check_anchor("李白-千魇归渊", {"op": ">", "ref": "不存在"}) is not None
+
+    ok, _ = app.set_revenue("李白-千魇归渊", anchor={"op": "<", "ref": "小乔-线条小狗"}, updates=publish)
+    skin = open_app().get_skin("李白-千魇归渊")
+    assert ok and skin['is_new'] and skin['is_hidden'] and skin['real_price'] == "400" and skin['growth'] == 5.0
+    assert skin['revenue'] == "<1.2亿"
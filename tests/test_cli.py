@@ -0,0 +1,40 @@
+# 命令行导入：正常导入与坏单元格的报告
+
+import json
+
+import pytest
+
+import hok_cli
+
+
+@pytest.fixture
+def cli(repo, open_app):
+    open_app('json')  # 先完成迁移，之后比较 data.json 是否被改动；main() 改的 LOCAL_REPO_PATH 由 repo 夹具还原
+    return lambda *argv: hok_cli.main(['--repo', str(repo), *argv])
+
+
+def _write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_import_csv(repo, cli):
+    path = _write_csv(repo / "updates.csv", ["name,revenue,growth,is_new,quality",
+                                              "伽罗-沧流箭,3.00M,2.5,是,",
+                                              "新皮肤,1.00M,,,50.1"])
+    assert cli("import", path, "--create") == 0
+    skins = {s['name']: s for s in json.loads((repo / "data.json").read_text(encoding="utf-8"))['skins']}
+    assert skins["伽罗-沧流箭"]['revenue'] == "3.00M" and skins["伽罗-沧流箭"]['growth'] == 2.5
+    assert skins["伽罗-沧流箭"]['is_new'] is True and skins["新皮肤"]['quality'] == 50.1
+
+
+def test_import_csv_bad_cells(repo, cli, capsys):
+    before = (repo / "data.json").read_text(encoding="utf-8")
+    path = _write_csv(repo / "updates.csv", ["name,revenue,growth,quality",
+                                              "伽罗-沧流箭,3.00M,2.5,",
+                                              "李白-千魇归渊,9.00M,5%,",
+                                              "小乔-线条小狗,1.00M,,1.2."])
+    assert cli("import", path) == 1
+    err = capsys.readouterr().err
+    assert "第 3 行 growth='5%'" in err and "第 4 行 quality='1.2.'" in err
+    assert (repo / "data.json").read_text(encoding="utf-8") == before
@@ -0,0 +1,63 @@
+# 列式批量重算与逐条标量实现的一致性
+
+import copy
+import random
+
+import numpy as np
+
+import hok_columns
+import hok_logic
+
+
+def _scalar_recompute(item):
+    """逐条版本 (原 recompute_record)：返回销售额是否被重算"""
+    val_p = hok_logic.revenue_mean(item.get('real_price', '0'))
+    val_v = hok_logic.revenue_mean(item.get('sales_volume', '0'))
+    if val_v > 0:
+        item['sales_volume'] = hok_logic.format_to_english_unit(val_v)
+    if val_p > 0 and val_v > 0 and not hok_logic.is_anchored(item.get('revenue', '')):
+        item['revenue'] = hok_logic.format_to_english_unit(val_p * val_v)
+        return True
+    return False
+
+
+def _records(n, seed=0):
+    rng = random.Random(seed)
+    values = ["", "0", None, "abc", "12", "999.995", "1000", "999999.999", "1.5K", "61.30M", "2.5B", "3500万",
+              "1.2亿", "1.2亿~1.5亿", "10~20", ">21.47M", "<705.00K", "≈3M", 0, 7.25, 128.8, 400.0, 1e9]
+    records = []
+    for i in range(n):
+        rec = {'name': f"skin{i}"}
+        for field in ('real_price', 'sales_volume', 'revenue'):
+            if rng.random() < 0.9:
+                rec[field] = rng.choice(values) if rng.random() < 0.7 else str(round(rng.lognormvariate(8, 4), 3))
+        records.append(rec)
+    return records
+
+
+def test_recompute_matches_scalar_loop():
+    records = _records(3000)
+    original = copy.deepcopy(records)
+    expected = copy.deepcopy(records)
+    count = sum(_scalar_recompute(r) for r in expected)
+
+    recalc, diff = hok_columns.recompute(records)
+    assert recalc == count
+    assert records == expected
+    defaults = {'sales_volume': '0', 'revenue': ''}
+    changed = {(o['name'], f) for o, e in zip(original, expected) for f, d in defaults.items()
+               if o.get(f, d) != e.get(f, d)}
+    assert set(zip(diff['name'], diff['field'])) == changed
+
+
+def test_recompute_empty_and_unchanged():
+    recalc, diff = hok_columns.recompute([])
+    assert recalc == 0 and diff.empty
+    records = [{'name': "a", 'real_price': "10", 'sales_volume': "2.00K", 'revenue': "20.00K"},
+               {'name': "b", 'real_price': None, 'sales_volume': None, 'revenue': None}]
+    assert hok_columns.recompute(records)[1].empty
+
+
+def test_format_units_matches_scalar():
+    x = np.array([0, 0.5, 1, 12.345, 999, 999.995, 1000, 123456.789, 1e6, 999999999.9, 1e9, 5e12])
+    assert list(hok_columns.format_units(x)) == [hok_logic.format_to_english_unit(v) for v in x.tolist()]
@@ -0,0 +1,109 @@
+# 头像爬虫对本地桩 HTTP 服务器的测试：并发批量补全的成功 / 失败报告，爬取清单的跳过与条件请求
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import hok_logic
+
+IMAGE = b"\xff\xd8\xff\xe0 stub jpeg"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        with server.lock:
+            server.requests.append((url.path, self.headers.get('If-None-Match')))
+        if url.path == "/search":
+            word = parse_qs(url.query)['word'][0]
+            hit = server.images.get(word)
+            body = json.dumps({"data": [{"thumbURL": f"{server.base}/img/{hit}"}] if hit else []}).encode()
+            self._reply(200, body, {'Content-Type': 'application/json'})
+        elif url.path.startswith("/img/") and url.path[5:] not in server.broken:
+            etag = '"v1"'
+            if self.headers.get('If-None-Match') == etag:
+                self._reply(304, b"", {'ETag': etag})
+            else:
+                self._reply(200, IMAGE, {'ETag': etag, 'Content-Type': 'image/jpeg'})
+        else:
+            self._reply(404, b"", {})
+
+    def _reply(self, status, body, headers):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.base = f"http://127.0.0.1:{server.server_address[1]}"
+    # 搜索关键词 -> 图片路径；broken 里的图片地址返回 404
+    server.images = {"千魇归渊 李白": "libai", "春霖将至 貂蝉": "diaochan", "坏图 伽罗": "gone"}
+    server.broken = {"gone"}
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _crawler(tmp_path, stub):
+    return hok_logic.SkinCrawler(str(tmp_path), search_url=stub.base + "/search", concurrency=4, rate=0, retries=0)
+
+
+def test_fetch_many_reports_ok_and_failed(tmp_path, stub):
+    skins = [{"name": "李白-千魇归渊"}, {"name": "貂蝉-春霖将至"}, {"name": "小乔-线条小狗"}, {"name": "伽罗-坏图"}]
+    report = _crawler(tmp_path, stub).fetch_many(skins)
+
+    assert sorted(n for n, _ in report['ok']) == ["李白-千魇归渊", "貂蝉-春霖将至"]
+    failed = dict(report['failed'])
+    assert set(failed) == {"小乔-线条小狗", "伽罗-坏图"}
+    assert "未找到图片" in failed["小乔-线条小狗"] and "爬取错误" in failed["伽罗-坏图"]
+    assert skins[0]['local_img'] == "skin_avatars/李白-千魇归渊.jpg"
+    assert (tmp_path / "skin_avatars" / "李白-千魇归渊.jpg").read_bytes() == IMAGE
+    assert 'local_img' not in skins[2] and 'local_img' not in skins[3]
+
+
+def test_manifest_skips_repeat_and_memoizes_misses(tmp_path, stub):
+    skins = [{"name": "李白-千魇归渊"}, {"name": "小乔-线条小狗"}]
+    _crawler(tmp_path, stub).fetch_many(skins)
+    assert len(stub.requests) == 3  # 两次搜索 + 一次下载
+
+    # 重复运行 (新进程读取清单)：已有图片、已知未找到都不联网
+    del stub.requests[:]
+    report = _crawler(tmp_path, stub).fetch_many(skins)
+    assert stub.requests == []
+    assert "跳过" in dict(report['failed'])["小乔-线条小狗"]
+
+    # 过了 TTL 后重新搜索
+    path = tmp_path / hok_logic.CRAWL_MANIFEST
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    manifest["线条小狗 小乔"]['ts'] -= hok_logic.CRAWL_FAIL_TTL + 1
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    _crawler(tmp_path, stub).fetch_many(skins)
+    assert [p for p, _ in stub.requests] == ["/search"]
+    assert json.loads(path.read_text(encoding="utf-8"))["线条小狗 小乔"]['failures'] == 2
+
+
+def test_refresh_sends_conditional_request(tmp_path, stub):
+    skins = [{"name": "李白-千魇归渊"}]
+    _crawler(tmp_path, stub).fetch_many(skins)
+    del stub.requests[:]
+
+    report = _crawler(tmp_path, stub).fetch_many(skins, refresh=True)
+    assert stub.requests == [("/img/libai", '"v1"')]  # 不再搜索，带 ETag 的条件请求得到 304
+    assert "图片未变化" in dict(report['ok'])["李白-千魇归渊"]
+    assert (tmp_path / "skin_avatars" / "李白-千魇归渊.jpg").read_bytes() == IMAGE
@@ -0,0 +1,42 @@
+# 增量维护的排名索引与整表排序的一致性
+
+import json
+import random
+
+import hok_bench
+
+
+def test_ranked_index_matches_full_sort(repo, open_app):
+    with open(repo / "data.json", "w", encoding="utf-8") as f:
+        json.dump(hok_bench.generate_catalog(600, seed=1), f, ensure_ascii=False)
+    app = open_app()
+    rng = random.Random(7)
+    app._ranked_skins()
+    added = 0
+
+    for step in range(400):
+        names = app.skin_names()
+        kind = rng.random()
+        if kind < 0.5:
+            # 一半取常见值 (大量并列)，一半随机金额
+            revenue = rng.choice(["0", "", "1.5K", "61.30M", "1.2亿", "10~20", ">3M"]) if rng.random() < 0.5 else \
+                hok_bench._money(rng)
+            app.set_revenue(rng.choice(names), revenue)
+        elif kind < 0.75:
+            skin = app.get_skin(rng.choice(names))
+            skin['is_hidden'] = not skin['is_hidden']
+            app.save_data(skins=[skin])
+        elif kind < 0.9:
+            added += 1
+            assert app.add_skin({"name": f"新皮肤{added}", "quality": 500, "revenue": f"{rng.randint(1, 999)}M"})
+        else:
+            assert app.delete_skin(rng.choice(names))
+
+        assert app.ranked.valid  # 单条变动走增量路径，不触发重建
+        keys = [app._get_sort_key(s) for s in app.ranked.skins]
+        assert keys == sorted(app._get_sort_key(s) for s in app.all_skins)
+        assert {id(s) for s in app.ranked.skins} == {id(s) for s in app.all_skins}
+
+    top = [app._get_sort_key(s) for s in app.top_leaderboard(50)]
+    active = sorted(app._get_sort_key(s) for s in app.all_skins if app._is_active(s))
+    assert top == active[:50]
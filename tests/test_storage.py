@@ -0,0 +1,73 @@
+# 三种存储模式下的 迁移 -> 保存 -> 重新加载 往返，以及按名称新增 / 删除
+
+import json
+
+import pytest
+
+import hok_schema
+
+MODES = ('json', 'journal', 'sqlite')
+
+
+def _snapshot(app):
+    return sorted((s.to_dict() for s in app.all_skins), key=lambda s: s['name'])
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_migrate_save_reload(open_app, mode):
+    app = open_app(mode)
+    assert len(app.all_skins) == 4
+    assert hok_schema.validate({'schema_version': app.schema_version, 'skins': _snapshot(app)}, full=True) == []
+
+    # 迁移结果已经落盘：再次加载不需要迁移，数据一致
+    again = open_app(mode)
+    assert again.load_data() is False
+    assert hok_schema.version_of(again.store.load()) == hok_schema.SCHEMA_VERSION
+    assert _snapshot(again) == _snapshot(app)
+
+    assert again.set_revenue("伽罗-沧流箭", "99.00M")[0]
+    reloaded = open_app(mode)
+    assert reloaded.get_skin("伽罗-沧流箭")['revenue'] == "99.00M"
+    assert reloaded.all_skins[0]['name'] == "小乔-线条小狗"  # 1.35亿 排第一
+
+
+def test_journal_migration_compacts_snapshot(repo, open_app):
+    open_app('journal')
+    with open(repo / "data.json", encoding="utf-8") as f:
+        assert json.load(f)['schema_version'] == hok_schema.SCHEMA_VERSION
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_duplicate_add_and_delete(open_app, mode):
+    app = open_app(mode)
+    assert app.add_skin({"name": "李白-千魇归渊", "quality": 1, "revenue": "1"}) is None
+    assert app.add_skin({"name": "李白-新皮肤", "quality": 1, "revenue": "1"}) is not None
+    assert app.delete_skin("貂蝉-春霖将至")
+    assert not app.delete_skin("貂蝉-春霖将至")
+
+    reloaded = open_app(mode)
+    names = {s['name'] for s in reloaded.all_skins}
+    assert len(reloaded.all_skins) == 4
+    assert "李白-新皮肤" in names and "貂蝉-春霖将至" not in names
+    assert reloaded.get_skin("李白-千魇归渊")['revenue'] == "61.30M"
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_bad_quality_code_is_kept(repo, open_app, mode):
+    with open(repo / "data.json", "w", encoding="utf-8") as f:
+        json.dump({"skins": [{"quality": "5.0.1", "name": "A", "revenue": "1M"},
+                             {"quality": "500", "name": "B", "revenue": "2M"}]}, f)
+    app = open_app(mode)
+    assert [s['name'] for s in app.all_skins] == ["B", "A"]
+    assert app.get_skin("A")['quality'] == "5.0.1" and app.get_skin("B")['quality'] == 500
+    assert open_app(mode).get_skin("A")['quality'] == "5.0.1"
+
+
+@pytest.mark.parametrize('text', ['{"skins": [{"name": "A", "revenue": "1M"}, 7]}', '{"skins": [{"name": "A"'])
+@pytest.mark.parametrize('mode', MODES)
+def test_failed_load_does_not_overwrite(repo, open_app, mode, text):
+    (repo / "data.json").write_text(text, encoding="utf-8")
+    app = open_app(mode)
+    assert app.all_skins == [] and app._load_error is not None
+    app.save_data()
+    assert (repo / "data.json").read_text(encoding="utf-8") == text